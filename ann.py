@@ -0,0 +1,179 @@
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from utils.neighbors import (DEFAULT_BLOCK_BYTES, DEFAULT_TOP_K, NeighborIndex, _block_rows,
+                             build_neighbor_index, effective_k, select_top_k, top_k_block)
+
+# ------------------------------------------------------------------
+# IVF (inverted file) neighbor engine
+# ------------------------------------------------------------------
+# The exact engine compares every movie with every other one: O(N^2).
+# Here the normalized vectors are clustered with spherical k-means into
+# `nlist` lists, and each movie is only compared with the members of the
+# `nprobe` lists whose centroids are closest to it. Work per movie is
+# ~nprobe * N / nlist, so a 1M-title catalog builds on a CPU-only box.
+# Raising nprobe (or lowering nlist) trades build time for recall;
+# recall_at_k measures it against the exact engine.
+#
+# The result is a regular NeighborIndex (scores are exact cosines, only
+# some true neighbors may be missing), so recommend_movies is unchanged.
+
+DEFAULT_ENGINE = "exact"
+DEFAULT_NPROBE = 16
+DEFAULT_TRAIN_SAMPLE = 100_000
+DEFAULT_ITERATIONS = 10
+
+
+def default_nlist(n_rows):
+    """About 4 * sqrt(N) lists, e.g. 4000 lists of ~250 movies for 1M titles."""
+    return max(1, int(4 * np.sqrt(n_rows)))
+
+
+def _top_columns(block, n):
+    """Column positions of the `n` largest values of each row, best first."""
+    if n < block.shape[1]:
+        part = np.argpartition(-block, n - 1, axis=1)[:, :n]
+    else:
+        part = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+    order = np.argsort(-np.take_along_axis(block, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def nearest_centroids(X, centroids, n=1, block_bytes=DEFAULT_BLOCK_BYTES):
+    """(N, n) int32 ids of the `n` centroids most similar to each row of `X`."""
+    out = np.empty((X.shape[0], n), dtype=np.int32)
+    step = _block_rows(len(centroids), block_bytes)
+    for start in range(0, X.shape[0], step):
+        block = np.asarray(X[start:start + step] @ centroids.T)
+        out[start:start + step] = _top_columns(block, n)
+    return out
+
+
+def train_centroids(X, nlist, sample=DEFAULT_TRAIN_SAMPLE, iterations=DEFAULT_ITERATIONS, seed=0,
+                    block_bytes=DEFAULT_BLOCK_BYTES):
+    """Spherical k-means on a random sample of the L2-normalized rows of `X`."""
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    S = X[np.sort(rng.choice(n, min(n, max(sample, nlist)), replace=False))]
+    centroids = S[rng.choice(S.shape[0], nlist, replace=False)].toarray()
+
+    for _ in range(iterations):
+        assign = nearest_centroids(S, centroids, 1, block_bytes)[:, 0]
+        members = sparse.csr_matrix((np.ones(len(assign), dtype=np.float32), (assign, np.arange(len(assign)))),
+                                    shape=(nlist, S.shape[0]))
+        sums = (members @ S).toarray()
+        empty = np.flatnonzero(np.bincount(assign, minlength=nlist) == 0)
+        if len(empty):
+            sums[empty] = S[rng.choice(S.shape[0], len(empty), replace=False)].toarray()
+        centroids = normalize(sums)
+    return centroids.astype(np.float32)
+
+
+def build_ivf_neighbor_index(vectors, k=DEFAULT_TOP_K, block_bytes=DEFAULT_BLOCK_BYTES, out=None,
+                             nlist=None, nprobe=DEFAULT_NPROBE, train_sample=DEFAULT_TRAIN_SAMPLE,
+                             iterations=DEFAULT_ITERATIONS, seed=0):
+    """Approximate build_neighbor_index: same arguments and output, plus the IVF knobs.
+
+    Every movie is filed under its nearest centroid and probes its `nprobe`
+    nearest ones. Lists are processed one at a time: the movies probing a
+    list are scored against its members in dense blocks and merged into
+    their running top-K.
+    """
+    X = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+    X.sort_indices()  # same summation order, hence same clusters, for equal vectors in any layout
+    n = X.shape[0]
+    k = effective_k(n, k)
+
+    if out is None:
+        out = NeighborIndex(np.empty((n, k), dtype=np.int32), np.empty((n, k), dtype=np.float32))
+    if k == 0:
+        return out
+    out.ids[:] = -1
+    out.scores[:] = 0.0
+
+    nlist = min(nlist or default_nlist(n), n)
+    nprobe = min(nprobe, nlist)
+    centroids = train_centroids(X, nlist, train_sample, iterations, seed, block_bytes)
+    probes = nearest_centroids(X, centroids, nprobe, block_bytes)
+
+    # Members of each list (by nearest centroid) and the movies probing it, as CSR-style runs
+    members = np.argsort(probes[:, 0], kind="stable")
+    member_bounds = np.searchsorted(probes[members, 0], np.arange(nlist + 1))
+    flat = probes.ravel()
+    probers = np.argsort(flat, kind="stable") // nprobe
+    prober_bounds = np.searchsorted(np.sort(flat), np.arange(nlist + 1))
+    XT = X.T.tocsc()
+
+    for c in range(nlist):
+        cand = members[member_bounds[c]:member_bounds[c + 1]]
+        queries = probers[prober_bounds[c]:prober_bounds[c + 1]]
+        if not len(cand) or not len(queries):
+            continue
+        cand_ids = cand.astype(np.int32)
+        step = _block_rows(len(cand) + k, block_bytes)
+        for start in range(0, len(queries), step):
+            rows = queries[start:start + step]
+            block = (X[rows] @ XT[:, cand]).toarray()
+            block[rows[:, None] == cand[None, :]] = -np.inf  # the movie itself
+            ids = out.ids[rows]
+            out.ids[rows], out.scores[rows] = select_top_k(
+                np.concatenate([ids, np.broadcast_to(cand_ids, block.shape)], axis=1),
+                np.concatenate([np.where(ids >= 0, out.scores[rows], -np.inf), block], axis=1),
+                k,
+            )
+
+    return out
+
+
+ENGINES = {
+    "exact": build_neighbor_index,
+    "ivf": build_ivf_neighbor_index,
+}
+
+
+def build_neighbors(vectors, engine=DEFAULT_ENGINE, k=DEFAULT_TOP_K, out=None, **options):
+    """Builds a NeighborIndex with the named engine; `options` go to the engine."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown neighbor engine {engine!r}, expected one of {sorted(ENGINES)}")
+    return ENGINES[engine](vectors, k=k, out=out, **options)
+
+
+# ------------------------------------------------------------------
+# Recall against the exact engine
+# ------------------------------------------------------------------
+def exact_neighbors(vectors, rows, k=DEFAULT_TOP_K, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Exact (ids, scores) of the given rows only; O(len(rows) * N)."""
+    X = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+    rows = np.asarray(rows)
+    k = effective_k(X.shape[0], k)
+    XT = X.T.tocsc()
+    ids = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    step = _block_rows(X.shape[0], block_bytes)
+    for start in range(0, len(rows), step):
+        chunk = rows[start:start + step]
+        ids[start:start + step], scores[start:start + step] = top_k_block((X[chunk] @ XT).toarray(), chunk, k)
+    return ids, scores
+
+
+def recall_at_k(index, vectors, k=10, sample=1000, seed=0):
+    """Share of each sampled movie's true top-k neighbors that `index` lists in its top k.
+
+    A listed neighbor scoring at least the true k-th score counts as found,
+    so equally similar movies are interchangeable.
+    """
+    n = len(index)
+    k = min(k, index.k)
+    if not n or not k:
+        return 1.0
+    rows = np.sort(np.random.default_rng(seed).choice(n, min(sample, n), replace=False))
+    true_ids, true_scores = exact_neighbors(vectors, rows, k)
+
+    approx_ids = np.asarray(index.ids[rows, :k])
+    approx_scores = np.asarray(index.scores[rows, :k])
+    valid = true_ids >= 0
+    wanted = valid.sum(axis=1)
+    kth = np.where(wanted > 0, true_scores[np.arange(len(rows)), np.maximum(wanted - 1, 0)], np.inf)
+    found = ((approx_ids >= 0) & (approx_scores >= kth[:, None] - 1e-6)).sum(axis=1)
+    return float(np.minimum(found, wanted).sum() / max(wanted.sum(), 1))
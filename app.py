@@ -1,15 +1,21 @@
 import streamlit as st
-import pickle
 import pandas as pd
 import streamlit.components.v1 as components
 import html
 import urllib.parse
 import json
-import requests
+import os
 import time
 import re
-from groq import Groq
 from utils.recommender import recommend_movies
+from utils.artifact import ArtifactError
+from utils.result_cache import ResultCache
+from utils.instrumentation import Instrumentation
+from utils.hot_reload import ModelReloader
+from utils.jarvis_stream import replay_answer
+
+# groq, requests and the TMDB client are imported on first use (Jarvis tab)
+# so they don't slow down the first page of every new server process.
 
 # -------------------------------------------------------------------------
 # 0. API CONFIGURATION
@@ -17,9 +23,15 @@ from utils.recommender import recommend_movies
 # ⚠️ PASTE YOUR KEYS HERE
 GROQ_API_KEY = "Your GROQ_API_KEY"
 TMDB_API_KEY = "Your TMDB_API_KEY"
-
-# Initialize Groq
-client = Groq(api_key=GROQ_API_KEY)
+TMDB_DEADLINE = 4.0  # seconds for each Jarvis card lookup, counted from when its title arrives
+TMDB_CACHE_PATH = "utils/tmdb_cache.sqlite"
+TMDB_CACHE_TTL = 7 * 24 * 3600
+TMDB_CACHE_MAX_ENTRIES = 20_000
+JARVIS_CACHE_PATH = "utils/jarvis_cache.sqlite"
+JARVIS_CACHE_TTL = 7 * 24 * 3600
+JARVIS_CACHE_MAX_ENTRIES = 5_000
+JARVIS_CACHE_THRESHOLD = 0.8  # term-count cosine for reusing a rephrased prompt with the same terms
+JARVIS_STREAMING = True  # show Jarvis' text and cards as the completion streams in
 
 # -------------------------------------------------------------------------
 # 1. PAGE CONFIG
@@ -36,68 +48,68 @@ st.set_page_config(
 # -------------------------------------------------------------------------
 if "booted" not in st.session_state:
     st.session_state.booted = False
+    st.session_state.session_started = time.perf_counter()
 
 
-# -------------------------------------------------------------------------
-# 3. HELPER FUNCTIONS
-# -------------------------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_instrumentation():
+    """Timing registry, metrics endpoint and profiler (see utils/instrumentation.py), once per process."""
+    return Instrumentation.from_env()
 
-def style_ai_response(text):
-    """Highlights keywords in RED."""
-    keywords = [
-        "horror", "scary", "terrifying", "spooky", "creepy", "thriller",
-        "suspense", "ghost", "blood", "demon", "kill", "death", "nightmare",
-        "chilling", "dark", "evil", "haunted", "fear", "love", "romance", "romantic"
-    ]
-    for word in keywords:
-        pattern = re.compile(f"\\b({word})\\b", re.IGNORECASE)
-        text = pattern.sub(r":red[**\1**]", text)
-    return text
-
-
-def fetch_tmdb_data(movie_title, ai_overview=None):
-    """Fetches Poster, Rating, and Trailer from TMDB."""
-    data = {
-        "poster": "https://via.placeholder.com/300x450?text=No+Poster",
-        "rating": "N/A",
-        "overview": ai_overview if ai_overview else "No details available.",
-        "trailer": f"https://www.youtube.com/results?search_query={urllib.parse.quote(movie_title)}+trailer"
-    }
 
-    try:
-        search_url = "https://api.themoviedb.org/3/search/movie"
-        params = {"api_key": TMDB_API_KEY, "query": movie_title, "page": 1, "include_adult": "false"}
-        response = requests.get(search_url, params=params, timeout=3)
-        results = response.json().get("results", [])
-
-        if results:
-            top_result = results[0]
-            movie_id = top_result["id"]
-
-            if top_result.get("poster_path"):
-                data["poster"] = f"https://image.tmdb.org/t/p/w500{top_result['poster_path']}"
-            if top_result.get("vote_average"):
-                data["rating"] = round(top_result.get("vote_average"), 1)
-
-            tmdb_overview = top_result.get("overview", "")
-            if len(tmdb_overview) > 20:
-                data["overview"] = tmdb_overview
-
-            video_url = f"https://api.themoviedb.org/3/movie/{movie_id}/videos"
-            vid_response = requests.get(video_url, params={"api_key": TMDB_API_KEY}, timeout=3)
-            vid_data = vid_response.json().get("results", [])
-            for vid in vid_data:
-                if vid["site"] == "YouTube" and vid["type"] == "Trailer":
-                    data["trailer"] = f"https://www.youtube.com/watch?v={vid['key']}"
-                    break
-    except Exception as e:
-        print(f"TMDB Error: {e}")
-
-    return data
-
-
-def get_ai_recommendation(user_query):
-    system_prompt = """
+def main():
+    """One script run: everything below the page config, timed as a rerun by `timing`."""
+    # -------------------------------------------------------------------------
+    # 3. HELPER FUNCTIONS
+    # -------------------------------------------------------------------------
+
+    def style_ai_response(text):
+        """Highlights keywords in RED."""
+        keywords = [
+            "horror", "scary", "terrifying", "spooky", "creepy", "thriller",
+            "suspense", "ghost", "blood", "demon", "kill", "death", "nightmare",
+            "chilling", "dark", "evil", "haunted", "fear", "love", "romance", "romantic"
+        ]
+        for word in keywords:
+            pattern = re.compile(f"\\b({word})\\b", re.IGNORECASE)
+            text = pattern.sub(r":red[**\1**]", text)
+        return text
+
+
+    @st.cache_resource(show_spinner=False)
+    def get_tmdb_client():
+        """One pooled TMDB client per server process, shared by every session."""
+        from utils.tmdb import TMDBClient
+        from utils.tmdb_cache import TMDBCache
+        cache = TMDBCache(TMDB_CACHE_PATH, ttl=TMDB_CACHE_TTL, max_entries=TMDB_CACHE_MAX_ENTRIES)
+        return TMDBClient(TMDB_API_KEY, cache=cache)
+
+
+    @st.cache_resource(show_spinner=False)
+    def get_jarvis_cache():
+        """Jarvis answers and their cards, shared by every session (and process) via SQLite."""
+        from utils.jarvis_cache import JarvisCache
+        return JarvisCache(JARVIS_CACHE_PATH, ttl=JARVIS_CACHE_TTL, max_entries=JARVIS_CACHE_MAX_ENTRIES,
+                           threshold=JARVIS_CACHE_THRESHOLD)
+
+
+    @st.cache_resource(show_spinner=False)
+    def get_groq_client():
+        """Created on the first Jarvis question instead of at startup.
+
+        CINEMATCH_FAKE_LLM=<answer.json> swaps in a local fake that streams that
+        answer, for trying the Jarvis tab offline.
+        """
+        fake_answer = os.environ.get("CINEMATCH_FAKE_LLM")
+        if fake_answer:
+            from utils.jarvis_stream import FakeGroqClient
+            with open(fake_answer, encoding="utf-8") as f:
+                return FakeGroqClient(f.read())
+        from groq import Groq
+        return Groq(api_key=GROQ_API_KEY)
+
+
+    JARVIS_SYSTEM_PROMPT = """
     You are Jarvis, a sophisticated AI movie concierge.
     1. Answer the user's question with personality.
     2. Suggest 5-8 specific movies relevant to the query.
@@ -108,30 +120,70 @@ def get_ai_recommendation(user_query):
             - "overview": A 1-sentence engaging plot summary.
     4. Do not output markdown blocks, just raw JSON.
     """
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_query}],
-            temperature=0.7, max_tokens=800, response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
-    except Exception as e:
-        return {"response_text": f"Error: {str(e)}", "recommendations": []}
-
-
-def render_movie_cards(movie_data_list):
-    cards_html = ""
-    for mov in movie_data_list:
-        title = html.escape(str(mov['title']))
-        poster = mov['poster']
-        rating = mov.get('rating', 'N/A')
-        overview = html.escape(str(mov.get('overview', '')))[:110] + "..."
-        trailer_link = mov.get('trailer', '#')
-        if trailer_link == '#' or not trailer_link:
-            trailer_link = f"https://www.youtube.com/results?search_query={urllib.parse.quote(mov['title'])}+trailer"
-        imdb_link = f"https://www.imdb.com/find?q={urllib.parse.quote(mov['title'])}"
-
-        cards_html += f"""
+
+
+    def get_ai_recommendation(user_query):
+        try:
+            completion = get_groq_client().chat.completions.create(
+                model="llama-3.1-8b-instant",
+                messages=[{"role": "system", "content": JARVIS_SYSTEM_PROMPT}, {"role": "user", "content": user_query}],
+                temperature=0.7, max_tokens=800, response_format={"type": "json_object"}
+            )
+            return json.loads(completion.choices[0].message.content)
+        except Exception as e:
+            return {"response_text": f"Error: {str(e)}", "recommendations": []}
+
+
+    def stream_ai_recommendation(user_query):
+        """Jarvis' answer as it streams in: ("text", delta) and ("recommendation", item) events, then ("done", answer)."""
+        from utils.jarvis_stream import parse_jarvis_stream
+
+        def pieces():
+            # groq_first_token: request until the first chunk; groq_stream: request until the last one
+            started = time.perf_counter()
+            with timing.span("groq_stream"):
+                # JSON mode can't be combined with streaming; the system prompt already asks for raw JSON
+                stream = get_groq_client().chat.completions.create(
+                    model="llama-3.1-8b-instant",
+                    messages=[{"role": "system", "content": JARVIS_SYSTEM_PROMPT}, {"role": "user", "content": user_query}],
+                    temperature=0.7, max_tokens=800, stream=True
+                )
+                for number, chunk in enumerate(stream):
+                    if number == 0:
+                        timing.record("groq_first_token", time.perf_counter() - started)
+                    yield chunk.choices[0].delta.content or ""
+
+        try:
+            yield from parse_jarvis_stream(pieces())
+        except Exception as e:
+            yield "done", {"response_text": f"Error: {str(e)}", "recommendations": []}
+
+
+    def catalog_card(raw_title, ai_overview):
+        """Card for a Jarvis title from the local catalog, or None when the title doesn't resolve."""
+        match = title_resolver.resolve_many([raw_title])[0]
+        if match is None:
+            return None
+        row = movies.iloc[match[0]]
+        poster = row["poster_url"] if str(row["poster_url"]).startswith("http") else "https://via.placeholder.com/300x450"
+        return {"title": row["title"], "poster": poster, "rating": round(row["vote_average"], 1),
+                "overview": overviews[match[0]],
+                "trailer": f"https://www.youtube.com/results?search_query={urllib.parse.quote(row['title'])}+trailer"}
+
+
+    def render_movie_cards(movie_data_list):
+        cards_html = ""
+        for mov in movie_data_list:
+            title = html.escape(str(mov['title']))
+            poster = mov['poster']
+            rating = mov.get('rating', 'N/A')
+            overview = html.escape(str(mov.get('overview', '')))[:110] + "..."
+            trailer_link = mov.get('trailer', '#')
+            if trailer_link == '#' or not trailer_link:
+                trailer_link = f"https://www.youtube.com/results?search_query={urllib.parse.quote(mov['title'])}+trailer"
+            imdb_link = f"https://www.imdb.com/find?q={urllib.parse.quote(mov['title'])}"
+
+            cards_html += f"""
         <div class="flip-card">
           <div class="flip-card-inner">
             <div class="flip-card-front"><img src="{poster}" alt="Poster"></div>
@@ -147,7 +199,7 @@ def render_movie_cards(movie_data_list):
           </div>
         </div>
         """
-    return f"""
+        return f"""
     <!DOCTYPE html><html><head>
     <link href="https://fonts.googleapis.com/css2?family=Bebas+Neue&family=Poppins:wght@300;400;600&display=swap" rel="stylesheet">
     <style>
@@ -175,10 +227,18 @@ def render_movie_cards(movie_data_list):
     """
 
 
-# -------------------------------------------------------------------------
-# 4. PREMIUM CSS
-# -------------------------------------------------------------------------
-st.markdown("""
+    def show_movie_cards(slot, movie_data_list):
+        """(Re)draws a card strip in an st.empty() slot; returns its HTML."""
+        html_cards = render_movie_cards(movie_data_list)
+        with slot.container():
+            components.html(html_cards, height=380)
+        return html_cards
+
+
+    # -------------------------------------------------------------------------
+    # 4. PREMIUM CSS
+    # -------------------------------------------------------------------------
+    st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Bebas+Neue&family=Poppins:wght@300;400;600&display=swap');
 
@@ -254,149 +314,238 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# -------------------------------------------------------------------------
-# 5. BOOT SEQUENCE
-# -------------------------------------------------------------------------
-if not st.session_state.booted:
-    st.markdown(
-        """<div class="boot-screen"><div class="boot-logo">CINEMATCH</div><div class="boot-loader"></div></div>""",
-        unsafe_allow_html=True)
-    time.sleep(3.5)
-    st.session_state.booted = True
-    st.rerun()
+    # -------------------------------------------------------------------------
+    # 5. BOOT SEQUENCE
+    # -------------------------------------------------------------------------
+    MODEL_DIR = "utils/movie_model"
+    MODEL_RELOAD_INTERVAL = 10.0  # seconds between checks for a newly published model version
 
-# -------------------------------------------------------------------------
-# 6. LOAD DATA
-# -------------------------------------------------------------------------
-try:
-    with open(r"utils/movie_model.pkl", "rb") as f:
-        movies, cosine_sim = pickle.load(f)
-except FileNotFoundError:
-    st.error("Model file not found! Please run 'preprocess.py' first.")
-    st.stop()
 
-movies = movies.reset_index(drop=True)
-movies["poster_url"] = movies["poster_url"].fillna("")
-all_genres = sorted(list(set([g.title() for sublist in movies['genres_list'] for g in sublist if g])))
+    @st.cache_resource(show_spinner=False)
+    def get_model_reloader():
+        """Loads the memory-mapped model in a background thread, once per server process.
 
-# -------------------------------------------------------------------------
-# 7. MAIN UI
-# -------------------------------------------------------------------------
-with st.sidebar:
-    st.markdown(
-        "<h1 style='color:#E50914; font-family:Bebas Neue; text-align:center; font-size:3rem; margin:0;'>CINEMATCH</h1>",
-        unsafe_allow_html=True)
-    st.markdown("---")
-
-    st.markdown("### 🔍 Filters")
-    lang_map = {"English": "en", "Hindi": "hi"}
-    selected_langs = st.multiselect("Language", list(lang_map.keys()), ["English", "Hindi"])
-    target_langs = [lang_map[l] for l in selected_langs]
-    selected_genres = st.multiselect("Genre", all_genres, [])
-    target_genres = [g.lower() for g in selected_genres]
-
-    st.markdown("<br><br>", unsafe_allow_html=True)
-    st.info("💡 **Tip:** Ask Jarvis about regional cinema (e.g., 'Best Marathi rom-coms').")
-
-st.markdown('<div class="hero-glow"></div>', unsafe_allow_html=True)
-tab_home, tab_jarvis = st.tabs(["🎬 DISCOVER MOVIES", "🤖 CHAT WITH JARVIS"])
-
-# --- TAB 1: DISCOVER ---
-with tab_home:
-    col_search, col_btn = st.columns([4, 1])
-    with col_search:
-        # ✅ Reverted to Dropdown (Local Dataset Only)
-        selected_movie_name = st.selectbox("Search", movies["title"].sort_values().values, index=None,
-                                           placeholder="Search for a movie...", label_visibility="collapsed")
-    with col_btn:
-        run_search = st.button("SEARCH")
-
-    if run_search or True:
-        st.markdown("<br>", unsafe_allow_html=True)
-        if selected_movie_name:
-            st.markdown(
-                f"<h1 style='font-size:3rem;'>Because you liked <span style='color:#E50914'>{selected_movie_name}</span></h1>",
-                unsafe_allow_html=True)
-        else:
-            header_text = f"Top Rated {' & '.join(selected_genres[:2])}" if selected_genres else "Top Global Picks"
-            st.markdown(f"<h1 style='font-size:3rem;'>{header_text}</h1>", unsafe_allow_html=True)
-
-        recs = recommend_movies(movies, cosine_sim, title=selected_movie_name, target_languages=target_langs,
-                                target_genres=target_genres, top_n=12)
-        if recs.empty:
-            st.warning("No movies found. Adjust filters.")
-        else:
-            movie_data = []
-            for _, row in recs.iterrows():
-                trailer_link = f"https://www.youtube.com/results?search_query={urllib.parse.quote(row['title'])}+trailer"
-                movie_data.append({
-                    "title": row["title"],
-                    "poster": row["poster_url"] if str(row["poster_url"]).startswith(
-                        "http") else "https://via.placeholder.com/300x450",
-                    "rating": round(row["vote_average"], 1),
-                    "overview": row["overview"],
-                    "trailer": trailer_link
-                })
-            components.html(render_movie_cards(movie_data), height=400, scrolling=False)
-
-# --- TAB 2: JARVIS ---
-with tab_jarvis:
-    st.markdown("<h1 style='font-size:3rem;'>Ask <span style='color:#E50914;'>Jarvis</span></h1>",
-                unsafe_allow_html=True)
-    st.markdown("<p style='color:#aaa;'>Your AI Movie Concierge. Ask for recommendations, plots, or hidden gems.</p>",
-                unsafe_allow_html=True)
-
-    if "messages" not in st.session_state:
-        st.session_state.messages = [{"role": "assistant", "content": "Hi, I'm Jarvis. How can I help you?"}]
-
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-            if "html_content" in message:
-                components.html(message["html_content"], height=380)
-
-    if prompt := st.chat_input("Ask Jarvis (e.g., 'Best Marathi movies?')..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.markdown(prompt)
-
-        with st.chat_message("assistant"):
-            with st.spinner("Jarvis is thinking..."):
-                ai_data = get_ai_recommendation(prompt)
-                response_text = ai_data.get("response_text", "I couldn't process that.")
-                recommendations_list = ai_data.get("recommendations", [])
+        It then keeps watching MODEL_DIR and swaps in every newly published
+        version, so catalog refreshes need no restart (and sessions keep their state).
+        """
+        return ModelReloader(MODEL_DIR, interval=MODEL_RELOAD_INTERVAL)
+
+
+    model_source = get_model_reloader()
+
+    if not st.session_state.booted:
+        st.markdown(
+            """<div class="boot-screen"><div class="boot-logo">CINEMATCH</div><div class="boot-loader"></div></div>""",
+            unsafe_allow_html=True)
+        # The boot screen stays up exactly as long as the model takes to load
+        # (no wait at all once another session has loaded it); errors are shown below.
+        with timing.span("boot"):
+            try:
+                model_source.result()
+            except Exception:
+                pass
+        st.session_state.booted = True
+        timing.finish("boot")
+        st.rerun()
+
+    # -------------------------------------------------------------------------
+    # 6. LOAD DATA
+    # -------------------------------------------------------------------------
+    # One version for the whole rerun: a swap in the meantime only affects the next one.
+    # Without a usable model the reloader keeps watching, e.g. until preprocess.py ran.
+    try:
+        with timing.span("model_load"):
+            model = model_source.result()
+    except FileNotFoundError:
+        st.error("Model file not found! Please run 'preprocess.py' first.")
+        st.stop()
+    except ArtifactError as e:
+        st.error(f"Model artifact is invalid: {e}")
+        st.stop()
+
+    @st.cache_resource(show_spinner=False)
+    def get_result_cache():
+        """Ranked recommend_movies answers shared by every session of this process."""
+        return ResultCache()
+
+
+    movies, neighbors, catalog_index = model.movies, model.neighbors, model.index
+    overviews = model.overviews  # decoded per card, not held in memory
+    title_resolver = model.resolver
+    all_genres = catalog_index.display_genres
+
+    # -------------------------------------------------------------------------
+    # 7. MAIN UI
+    # -------------------------------------------------------------------------
+    with st.sidebar:
+        st.markdown(
+            "<h1 style='color:#E50914; font-family:Bebas Neue; text-align:center; font-size:3rem; margin:0;'>CINEMATCH</h1>",
+            unsafe_allow_html=True)
+        st.markdown("---")
+
+        st.markdown("### 🔍 Filters")
+        lang_map = {"English": "en", "Hindi": "hi"}
+        selected_langs = st.multiselect("Language", list(lang_map.keys()), ["English", "Hindi"])
+        target_langs = [lang_map[l] for l in selected_langs]
+        selected_genres = st.multiselect("Genre", all_genres, [])
+        target_genres = [g.lower() for g in selected_genres]
+
+        st.markdown("<br><br>", unsafe_allow_html=True)
+        st.info("💡 **Tip:** Ask Jarvis about regional cinema (e.g., 'Best Marathi rom-coms').")
+
+    st.markdown('<div class="hero-glow"></div>', unsafe_allow_html=True)
+    tab_home, tab_jarvis = st.tabs(["🎬 DISCOVER MOVIES", "🤖 CHAT WITH JARVIS"])
+
+    # --- TAB 1: DISCOVER ---
+    with tab_home:
+        col_search, col_btn = st.columns([4, 1])
+        with col_search:
+            # ✅ Reverted to Dropdown (Local Dataset Only)
+            selected_movie_name = st.selectbox("Search", catalog_index.sorted_titles, index=None,
+                                               placeholder="Search for a movie...", label_visibility="collapsed")
+        with col_btn:
+            run_search = st.button("SEARCH")
+
+        if run_search or True:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if selected_movie_name:
+                st.markdown(
+                    f"<h1 style='font-size:3rem;'>Because you liked <span style='color:#E50914'>{selected_movie_name}</span></h1>",
+                    unsafe_allow_html=True)
+            else:
+                header_text = f"Top Rated {' & '.join(selected_genres[:2])}" if selected_genres else "Top Global Picks"
+                st.markdown(f"<h1 style='font-size:3rem;'>{header_text}</h1>", unsafe_allow_html=True)
+
+            with timing.span("recommend_movies"):
+                recs = recommend_movies(movies, neighbors, catalog_index, title=selected_movie_name,
+                                        target_languages=target_langs, target_genres=target_genres, top_n=12,
+                                        cache=get_result_cache(), version=model.version)
+            if recs.empty:
+                st.warning("No movies found. Adjust filters.")
+            else:
+                movie_data = []
+                for idx, row in recs.iterrows():
+                    trailer_link = f"https://www.youtube.com/results?search_query={urllib.parse.quote(row['title'])}+trailer"
+                    movie_data.append({
+                        "title": row["title"],
+                        "poster": row["poster_url"] if str(row["poster_url"]).startswith(
+                            "http") else "https://via.placeholder.com/300x450",
+                        "rating": round(row["vote_average"], 1),
+                        "overview": overviews[idx],
+                        "trailer": trailer_link
+                    })
+                with timing.span("render_movie_cards"):
+                    html_cards = render_movie_cards(movie_data)
+                with timing.span("components_html"):
+                    components.html(html_cards, height=400, scrolling=False)
+                if "first_recommendation_s" not in st.session_state:
+                    # From the session's first script run (boot screen included) to its first cards
+                    st.session_state.first_recommendation_s = time.perf_counter() - st.session_state.session_started
+                    timing.record("time_to_first_recommendation", st.session_state.first_recommendation_s)
+
+    # --- TAB 2: JARVIS ---
+    with tab_jarvis:
+        st.markdown("<h1 style='font-size:3rem;'>Ask <span style='color:#E50914;'>Jarvis</span></h1>",
+                    unsafe_allow_html=True)
+        st.markdown("<p style='color:#aaa;'>Your AI Movie Concierge. Ask for recommendations, plots, or hidden gems.</p>",
+                    unsafe_allow_html=True)
+
+        if "messages" not in st.session_state:
+            st.session_state.messages = [{"role": "assistant", "content": "Hi, I'm Jarvis. How can I help you?"}]
+
+        with timing.span("chat_history"):
+            for message in st.session_state.messages:
+                with st.chat_message(message["role"]):
+                    st.markdown(message["content"])
+                    if "html_content" in message:
+                        components.html(message["html_content"], height=380)
+
+        if prompt := st.chat_input("Ask Jarvis (e.g., 'Best Marathi movies?')..."):
+            st.session_state.messages.append({"role": "user", "content": prompt})
+            with st.chat_message("user"):
+                st.markdown(prompt)
+
+            with st.chat_message("assistant"):
+                # Repeated (or near-duplicate) questions are answered from the cache, cards included
+                with timing.span("jarvis_cache"):
+                    cached = get_jarvis_cache().get(prompt)
+                if cached is not None:
+                    events = replay_answer(cached["ai"])
+                elif JARVIS_STREAMING:
+                    events = stream_ai_recommendation(prompt)
+                else:
+                    with st.spinner("Jarvis is thinking..."):
+                        with timing.span("groq"):
+                            events = replay_answer(get_ai_recommendation(prompt))
+                cached_cards = cached["cards"] if cached is not None and cached.get("version") == model.version else None
+
+                # Text shows up as it arrives; each recommendation becomes a card as soon as its object is complete.
+                # Titles missing from the local catalog start their TMDB lookup right away and show a placeholder.
+                text_slot, cards_slot = st.empty(), st.empty()
+                streamed_text, ai_data = "", None
+                movie_cards_data, tmdb_positions, tmdb_lookups = [], [], []
+                started = time.perf_counter()
+                with timing.span("jarvis_answer"):
+                    for event, value in events:
+                        if event == "text":
+                            if not streamed_text:
+                                timing.record("jarvis_first_text", time.perf_counter() - started)
+                            streamed_text += value
+                            text_slot.markdown(style_ai_response(streamed_text) + " ▌")
+                        elif event == "recommendation":
+                            if cached_cards:
+                                continue
+                            raw_title = str(value.get("title", "")).strip()
+                            ai_overview = value.get("overview", "No overview generated.")
+                            with timing.span("title_resolve"):
+                                card = catalog_card(raw_title, ai_overview)
+                            if card is None:
+                                from utils.tmdb import placeholder
+                                card = {**placeholder(raw_title, ai_overview), "title": raw_title, "overview": ai_overview}
+                                tmdb_positions.append(len(movie_cards_data))
+                                tmdb_lookups += get_tmdb_client().submit([(raw_title, ai_overview)], deadline=TMDB_DEADLINE)
+                            movie_cards_data.append(card)
+                            show_movie_cards(cards_slot, movie_cards_data)
+                        else:
+                            ai_data = value
 
+                response_text = ai_data.get("response_text", "I couldn't process that.")
                 formatted_response = style_ai_response(response_text)
 
                 if "error" in response_text.lower():
-                    st.error(response_text)
+                    text_slot.error(response_text)
                 else:
-                    st.markdown(formatted_response)
-
-                movie_cards_data = []
-                if recommendations_list:
-                    for item in recommendations_list:
-                        raw_title = item.get("title", "").strip()
-                        ai_overview = item.get("overview", "No overview generated.")
-
-                        match = movies[movies['title'].str.contains(raw_title, case=False, regex=False)]
-                        if not match.empty:
-                            row = match.iloc[0]
-                            title, poster, rating, overview = row["title"], row["poster_url"] if str(
-                                row["poster_url"]).startswith("http") else "https://via.placeholder.com/300x450", round(
-                                row["vote_average"], 1), row["overview"]
-                            trailer = f"https://www.youtube.com/results?search_query={urllib.parse.quote(title)}+trailer"
-                        else:
-                            title, overview = raw_title, ai_overview
-                            tmdb_data = fetch_tmdb_data(raw_title, ai_overview)
-                            poster, rating, trailer = tmdb_data["poster"], tmdb_data["rating"], tmdb_data["trailer"]
-                        movie_cards_data.append(
-                            {"title": title, "poster": poster, "rating": rating, "overview": overview,
-                             "trailer": trailer})
-
-                    html_cards = render_movie_cards(movie_cards_data)
-                    components.html(html_cards, height=380)
+                    text_slot.markdown(formatted_response)
+
+                if ai_data.get("recommendations") and cached_cards:
+                    movie_cards_data = cached_cards
+                if tmdb_lookups:
+                    with timing.span("tmdb"):
+                        tmdb_results = get_tmdb_client().gather(tmdb_lookups)
+                    for pos, tmdb_data in zip(tmdb_positions, tmdb_results):
+                        movie_cards_data[pos].update(
+                            {"poster": tmdb_data["poster"], "rating": tmdb_data["rating"],
+                             "trailer": tmdb_data["trailer"]})
+
+                if "error" not in response_text.lower() and (cached is None or movie_cards_data != cached["cards"]):
+                    from utils.tmdb import PLACEHOLDER_POSTER
+                    # Cards with placeholders (TMDB too slow or empty) are rebuilt on the next hit instead
+                    complete = all(card["poster"] != PLACEHOLDER_POSTER for card in movie_cards_data)
+                    get_jarvis_cache().put(prompt, {"ai": ai_data, "version": model.version,
+                                                    "cards": movie_cards_data if complete else None})
+
+                if movie_cards_data:
+                    with timing.span("render_movie_cards"):
+                        html_cards = show_movie_cards(cards_slot, movie_cards_data)
                     st.session_state.messages.append(
                         {"role": "assistant", "content": formatted_response, "html_content": html_cards})
                 else:
+                    cards_slot.empty()
                     st.session_state.messages.append({"role": "assistant", "content": formatted_response})
+
+
+# Named spans for this rerun. main() runs inside `with timing:`, so the rerun and its
+# profiler are finished however the script ends (st.stop, st.rerun, a newer rerun, a closed session).
+timing = get_instrumentation().start_rerun(st.session_state)
+with timing:
+    main()
@@ -0,0 +1,426 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+
+from utils.catalog_index import CatalogIndex, TextColumn, encode_texts, title_lookup
+from utils.neighbors import NeighborIndex
+from utils.title_resolver import TitleResolver, build_title_resolver
+
+# Bump whenever the on-disk layout changes; older artifacts are rejected.
+SCHEMA_VERSION = 2
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+MOVIES_FILE = "movies.parquet"
+CATALOG_FILE = "catalog.json"
+VOCABULARY_FILE = "vocabulary.json"
+RESOLVER_FILE = "resolver.json"
+
+MOVIES_SCHEMA = pa.schema([
+    ("title", pa.string()),
+    ("poster_url", pa.string()),
+    ("original_language", pa.string()),
+    ("vote_average", pa.float64()),
+    ("vote_count", pa.int64()),
+    ("overview", pa.string()),
+    ("genres_list", pa.list_(pa.string())),
+    ("director_clean", pa.string()),
+    ("cast_list", pa.list_(pa.string())),
+])
+
+# Columns of the in-memory `movies` frame. Overviews are served by a lazily
+# decoded TextColumn; genre and cast lists by the CatalogIndex CSR arrays.
+COMPACT_COLUMNS = ["title", "poster_url", "original_language", "vote_average", "vote_count", "director_clean"]
+
+Model = namedtuple("Model", ["movies", "neighbors", "index", "resolver", "version", "path", "overviews"])
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is missing, stale or corrupted."""
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _postings(rows_by_key, keys):
+    """{key: rows} -> (concatenated int32 rows, int64 offsets) in `keys` order."""
+    parts = [np.asarray(rows_by_key[k], dtype=np.int32) for k in keys]
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in parts], out=offsets[1:])
+    values = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+    return values, offsets
+
+
+def _unpostings(values, offsets, keys):
+    return {k: values[offsets[i]:offsets[i + 1]] for i, k in enumerate(keys)}
+
+
+def _index_arrays(index):
+    language_postings, language_posting_offsets = _postings(index.language_rows, index.languages)
+    genre_postings, genre_posting_offsets = _postings(index.genre_rows, index.genres)
+    leaderboard_rows, leaderboard_offsets = _postings(index.leaderboards, list(index.leaderboards))
+    return {
+        "lang_codes": index.lang_codes,
+        "genre_masks": index.genre_masks,
+        "genre_offsets": index.genre_offsets,
+        "genre_values": index.genre_values,
+        "director_codes": index.director_codes,
+        "cast_offsets": index.cast_offsets,
+        "cast_values": index.cast_values,
+        "language_postings": language_postings,
+        "language_posting_offsets": language_posting_offsets,
+        "genre_postings": genre_postings,
+        "genre_posting_offsets": genre_posting_offsets,
+        "vote_counts": index.vote_counts,
+        "vote_averages": index.vote_averages,
+        "leaderboard_rows": leaderboard_rows,
+        "leaderboard_offsets": leaderboard_offsets,
+    }
+
+
+def _catalog_json(index):
+    return {
+        "languages": index.languages,
+        "genres": index.genres,
+        "display_genres": index.display_genres,
+        "directors": index.directors,
+        "cast": index.cast,
+        "leaderboards": [[list(langs), genre] for langs, genre in index.leaderboards],
+    }
+
+
+# ------------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------------
+def write_manifest(version_dir, rows, extra=None):
+    """Checksums every file in `version_dir` and writes its manifest.
+
+    The artifact version is derived from the file checksums, so rebuilding
+    identical data yields the same version.
+    """
+    version_dir = Path(version_dir)
+    files = {}
+    for path in sorted(version_dir.iterdir()):
+        if path.name == MANIFEST:
+            continue
+        files[path.name] = {"sha256": _sha256(path), "bytes": path.stat().st_size}
+
+    checksum = hashlib.sha256(
+        "".join(f"{name}:{meta['sha256']}" for name, meta in files.items()).encode()
+    ).hexdigest()
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "version": checksum[:16],
+        "checksum": checksum,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "rows": int(rows),
+        "files": files,
+    }
+    if extra:
+        manifest.update(extra)
+    with open(version_dir / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def new_version_dir(root):
+    """Creates an empty staging directory inside `root` for a new artifact."""
+    staging = Path(root) / f".staging-{uuid.uuid4().hex}"
+    staging.mkdir(parents=True)
+    return staging
+
+
+def discard(staging):
+    """Removes a staging directory after a failed build."""
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def publish(root, staging, rows, extra=None, keep=3):
+    """Seals a staging directory and atomically points CURRENT at it.
+
+    Readers that already opened the previous version keep using its files;
+    new readers pick up the new one.
+    """
+    root = Path(root)
+    manifest = write_manifest(staging, rows, extra)
+    final_dir = root / manifest["version"]
+    if final_dir.exists():
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, final_dir)
+
+    tmp = root / f"{CURRENT}.{uuid.uuid4().hex}.tmp"
+    tmp.write_text(manifest["version"], encoding="utf-8")
+    os.replace(tmp, root / CURRENT)
+
+    _prune(root, keep, manifest["version"])
+    return manifest
+
+
+def _prune(root, keep, current):
+    versions = [p for p in root.iterdir() if p.is_dir() and (p / MANIFEST).exists()]
+    versions.sort(key=lambda p: (p / MANIFEST).stat().st_mtime, reverse=True)
+    for old in versions[keep:]:
+        if old.name == current:
+            continue
+        # Another process may still have the files mapped (Windows refuses to
+        # delete them); they will be pruned on a later publish.
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class MoviesWriter:
+    """Appends movie metadata chunks to the Parquet file of a staging directory.
+
+    Overviews also go to overview_bytes.npy / overview_offsets.npy for the
+    lazily decoded TextColumn; the bytes are spooled to disk chunk by chunk.
+    """
+
+    def __init__(self, staging):
+        self.staging = Path(staging)
+        self._writer = pq.ParquetWriter(self.staging / MOVIES_FILE, MOVIES_SCHEMA)
+        self._text = open(self.staging / "overview_bytes.tmp", "wb")
+        self._text_lengths = []
+        self.rows = 0
+
+    def write(self, movies):
+        table = pa.Table.from_pandas(movies, schema=MOVIES_SCHEMA, preserve_index=False)
+        self._writer.write_table(table)
+        data, offsets = encode_texts(movies["overview"].tolist())
+        self._text.write(data.tobytes())
+        self._text_lengths.append(np.diff(offsets))
+        self.rows += len(movies)
+
+    def close(self):
+        self._writer.close()
+        self._text.close()
+        spool = self.staging / "overview_bytes.tmp"
+        lengths = np.concatenate(self._text_lengths) if self._text_lengths else np.zeros(0, dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        np.save(self.staging / "overview_offsets.npy", offsets)
+        data = np.lib.format.open_memmap(self.staging / "overview_bytes.npy", mode="w+", dtype=np.uint8,
+                                         shape=(int(offsets[-1]),))
+        if len(data):
+            data[:] = np.memmap(spool, dtype=np.uint8, mode="r")
+            data.flush()
+        del data
+        spool.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_neighbor_arrays(staging, n_rows, k):
+    """Writable memory-mapped neighbor arrays, filled in place by build_neighbor_index."""
+    staging = Path(staging)
+    ids = np.lib.format.open_memmap(staging / "neighbor_ids.npy", mode="w+", dtype=np.int32, shape=(n_rows, k))
+    scores = np.lib.format.open_memmap(staging / "neighbor_scores.npy", mode="w+", dtype=np.float32, shape=(n_rows, k))
+    return NeighborIndex(ids, scores)
+
+
+def write_neighbors(staging, neighbors):
+    staging = Path(staging)
+    np.save(staging / "neighbor_ids.npy", np.ascontiguousarray(neighbors.ids))
+    np.save(staging / "neighbor_scores.npy", np.ascontiguousarray(neighbors.scores))
+
+
+def write_index(staging, index, titles):
+    """Writes the CatalogIndex arrays and vocabularies; `titles` are the row titles."""
+    staging = Path(staging)
+    arrays = _index_arrays(index)
+    # Dropdown order, so loading never has to sort the titles again
+    arrays["title_order"] = np.array(sorted(range(len(titles)), key=titles.__getitem__), dtype=np.int32)
+    for name, array in arrays.items():
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(array))
+    with open(staging / CATALOG_FILE, "w", encoding="utf-8") as f:
+        json.dump(_catalog_json(index), f)
+
+
+def write_resolver(staging, resolver):
+    """Writes the Jarvis title resolver (trigram postings + normalized titles)."""
+    staging = Path(staging)
+    np.save(staging / "resolver_gram_offsets.npy", resolver.gram_offsets)
+    np.save(staging / "resolver_gram_rows.npy", resolver.gram_rows)
+    np.save(staging / "resolver_row_grams.npy", resolver.row_grams)
+    with open(staging / RESOLVER_FILE, "w", encoding="utf-8") as f:
+        json.dump({"normalized": resolver.normalized, "grams": resolver.grams}, f)
+
+
+def write_features(staging, features, vocabulary):
+    """Writes the raw term-count matrix (CSR parts) and its vocabulary.
+
+    Incremental updates and neighbor engines re-use them instead of
+    refitting the vectorizer.
+    """
+    staging = Path(staging)
+    features = sparse.csr_matrix(features)
+    # scipy wants indices and indptr in one dtype; int32 unless nnz overflows it
+    index_dtype = np.int32 if features.nnz < 2 ** 31 else np.int64
+    np.save(staging / "features_data.npy", features.data.astype(np.float32))
+    np.save(staging / "features_indices.npy", features.indices.astype(index_dtype))
+    np.save(staging / "features_indptr.npy", features.indptr.astype(index_dtype))
+    with open(staging / VOCABULARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f)
+
+
+def save_model(root, movies, neighbors, index, features, vocabulary, extra=None, keep=3):
+    """Writes a new artifact version under `root` and makes it current."""
+    staging = new_version_dir(root)
+    with MoviesWriter(staging) as writer:
+        writer.write(movies.reset_index(drop=True))
+    write_neighbors(staging, neighbors)
+    titles = movies["title"].astype(str).tolist()
+    write_index(staging, index, titles)
+    write_resolver(staging, build_title_resolver(titles, movies["vote_count"].to_numpy()))
+    write_features(staging, features, vocabulary)
+    return publish(root, staging, len(movies), extra, keep)
+
+
+# ------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------
+def current_version(root):
+    """Version name CURRENT points to, or None if nothing was published yet."""
+    try:
+        return (Path(root) / CURRENT).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(version_dir):
+    version_dir = Path(version_dir)
+    try:
+        with open(version_dir / MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"No manifest in {version_dir}") from None
+
+    if manifest.get("schema_version") != SCHEMA_VERSION:
+        raise ArtifactError(
+            f"Artifact schema {manifest.get('schema_version')} != {SCHEMA_VERSION}; re-run preprocess.py"
+        )
+    return manifest
+
+
+def verify(version_dir, manifest, checksums=False):
+    """Checks sizes (and optionally sha256) of every file listed in the manifest."""
+    version_dir = Path(version_dir)
+    for name, meta in manifest["files"].items():
+        path = version_dir / name
+        if not path.exists():
+            raise ArtifactError(f"Missing artifact file {path}")
+        if path.stat().st_size != meta["bytes"]:
+            raise ArtifactError(f"Size mismatch for {path}")
+        if checksums and _sha256(path) != meta["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+
+
+def load_features(version_dir, arrays=None, mmap=True):
+    """Returns (CSR term-count matrix, vocabulary) of an artifact version."""
+    version_dir = Path(version_dir)
+    if arrays is None:
+        arrays = load_arrays(version_dir, read_manifest(version_dir), mmap)
+    with open(version_dir / VOCABULARY_FILE, encoding="utf-8") as f:
+        vocabulary = json.load(f)
+    n_rows = len(arrays["features_indptr"]) - 1
+    features = sparse.csr_matrix(
+        (arrays["features_data"], arrays["features_indices"], arrays["features_indptr"]),
+        shape=(n_rows, len(vocabulary)),
+    )
+    return features, vocabulary
+
+
+def load_arrays(version_dir, manifest, mmap=True):
+    """Loads every .npy file of a version, memory-mapped by default."""
+    mode = "r" if mmap else None
+    return {
+        name[:-4]: np.load(Path(version_dir) / name, mmap_mode=mode)
+        for name in manifest["files"] if name.endswith(".npy")
+    }
+
+
+def read_movies(version_dir, columns=None):
+    """Full movie metadata of a version (every MOVIES_SCHEMA column unless `columns` is given)."""
+    return pd.read_parquet(Path(version_dir) / MOVIES_FILE, columns=columns)
+
+
+def compact_movies(movies):
+    """Shrinks the in-memory movies frame: categorical codes and 32-bit numbers."""
+    return movies.astype({
+        "original_language": "category",
+        "director_clean": "category",
+        "vote_average": np.float32,
+        "vote_count": np.int32,
+    })
+
+
+def load_model(root, version=None, mmap=True, checksums=False):
+    """Loads a published artifact.
+
+    Numeric arrays and overview text are memory-mapped, so several processes
+    serving the same version share pages through the OS page cache.
+    `movies` only holds COMPACT_COLUMNS; use read_movies for everything.
+    """
+    root = Path(root)
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model artifact published in {root}")
+
+    version_dir = root / version
+    manifest = read_manifest(version_dir)
+    verify(version_dir, manifest, checksums)
+
+    arrays = load_arrays(version_dir, manifest, mmap)
+    with open(version_dir / CATALOG_FILE, encoding="utf-8") as f:
+        catalog = json.load(f)
+    movies = compact_movies(pd.read_parquet(version_dir / MOVIES_FILE, columns=COMPACT_COLUMNS, memory_map=mmap))
+
+    titles = movies["title"].astype(str).tolist()
+    title_rows = title_lookup(titles)
+
+    index = CatalogIndex(
+        title_rows, [titles[i] for i in arrays["title_order"]],
+        catalog["languages"], arrays["lang_codes"],
+        _unpostings(arrays["language_postings"], arrays["language_posting_offsets"], catalog["languages"]),
+        catalog["genres"], arrays["genre_masks"],
+        _unpostings(arrays["genre_postings"], arrays["genre_posting_offsets"], catalog["genres"]),
+        arrays["genre_offsets"], arrays["genre_values"], catalog["display_genres"],
+        catalog["directors"], arrays["director_codes"],
+        catalog["cast"], arrays["cast_offsets"], arrays["cast_values"],
+        arrays["vote_counts"], arrays["vote_averages"],
+        _unpostings(arrays["leaderboard_rows"], arrays["leaderboard_offsets"],
+                    [(tuple(langs), genre) for langs, genre in catalog["leaderboards"]]),
+    )
+    neighbors = NeighborIndex(arrays["neighbor_ids"], arrays["neighbor_scores"])
+
+    with open(version_dir / RESOLVER_FILE, encoding="utf-8") as f:
+        resolver_json = json.load(f)
+    resolver = TitleResolver(
+        resolver_json["normalized"], resolver_json["grams"],
+        arrays["resolver_gram_offsets"], arrays["resolver_gram_rows"], arrays["resolver_row_grams"],
+        np.asarray(arrays["vote_counts"]),
+    )
+    overviews = TextColumn(arrays["overview_bytes"], arrays["overview_offsets"])
+    return Model(movies, neighbors, index, resolver, manifest["version"], version_dir, overviews)
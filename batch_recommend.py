@@ -0,0 +1,137 @@
+import argparse
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.artifact import load_model
+from utils.leaderboards import DEFAULT_LANGUAGE_SETS
+from utils.recommender import recommend_rows_batch
+
+# ------------------------------------------------------------------
+# Offline "because you liked X" export
+# ------------------------------------------------------------------
+# Runs recommend_movies' scoring for every title with a process pool and
+# writes the ranked lists to JSONL or Parquet, e.g. for a CDN or a KV store.
+#
+#   python batch_recommend.py --out exports/recs.jsonl --workers 8 --presets
+#
+# Workers open the same memory-mapped artifact, so neighbor lists and
+# catalog codes live once in the OS page cache instead of being pickled to
+# every process.
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_DIR = BASE_DIR / "utils" / "movie_model"
+
+OUTPUT_SCHEMA = pa.schema([
+    ("model_version", pa.string()),
+    ("title", pa.string()),
+    ("languages", pa.list_(pa.string())),
+    ("genres", pa.list_(pa.string())),
+    ("rows", pa.list_(pa.int32())),
+    ("recommendations", pa.list_(pa.string())),
+])
+
+_model = None
+
+
+def _init_worker(model_dir, version):
+    global _model
+    _model = load_model(model_dir, version)
+
+
+def filter_presets(index, include_presets):
+    """(languages, genres) filters to export: none, plus one per language set and genre."""
+    presets = [((), ())]
+    if include_presets:
+        language_sets = {(lang,) for lang in index.languages}
+        language_sets |= {tuple(sorted(s)) for s in DEFAULT_LANGUAGE_SETS}
+        presets += [(langs, ()) for langs in sorted(language_sets)]
+        presets += [((), (genre,)) for genre in index.genres]
+    return presets
+
+
+def _score_titles(task):
+    titles, presets, top_n = task
+    movie_titles = _model.movies["title"]
+    queries = [(title, list(languages), list(genres), top_n) for title in titles for languages, genres in presets]
+    results = recommend_rows_batch(_model.neighbors, _model.index, queries)
+    return [{
+        "model_version": _model.version,
+        "title": title,
+        "languages": languages,
+        "genres": genres,
+        "rows": [int(r) for r in rows],
+        "recommendations": movie_titles.iloc[rows].tolist(),
+    } for (title, languages, genres, _), rows in zip(queries, results)]
+
+
+class _Writer:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix == ".parquet":
+            self._parquet = pq.ParquetWriter(self.path, OUTPUT_SCHEMA)
+            self._jsonl = None
+        else:
+            self._parquet = None
+            self._jsonl = open(self.path, "w", encoding="utf-8")
+
+    def write(self, records):
+        if self._parquet is not None:
+            self._parquet.write_table(pa.Table.from_pylist(records, schema=OUTPUT_SCHEMA))
+        else:
+            for record in records:
+                self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        else:
+            self._jsonl.close()
+
+
+def run(model_dir=MODEL_DIR, out="recommendations.jsonl", top_n=12, workers=None, chunk_size=256,
+        include_presets=False):
+    """Exports recommendations for every title; returns (titles, seconds)."""
+    model = load_model(model_dir)
+    titles = list(model.index.title_rows)
+    presets = filter_presets(model.index, include_presets)
+    tasks = [(titles[i:i + chunk_size], presets, top_n) for i in range(0, len(titles), chunk_size)]
+
+    print(f"Scoring {len(titles)} titles x {len(presets)} filter presets (model {model.version})...")
+    start = time.perf_counter()
+    writer = _Writer(out)
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model_dir, model.version)) as pool:
+            done = 0
+            for records in pool.imap(_score_titles, tasks):
+                writer.write(records)
+                done += len(records) // len(presets)
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(titles)} titles ({done / elapsed:,.0f} titles/s)", end="\r")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print()
+    return len(titles), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export recommendations for every title.")
+    parser.add_argument("--model", type=Path, default=MODEL_DIR, help="Model artifact directory")
+    parser.add_argument("--out", type=Path, default=Path("recommendations.jsonl"),
+                        help="Output file (.jsonl or .parquet)")
+    parser.add_argument("--top-n", type=int, default=12, help="Recommendations per title")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Titles per worker task")
+    parser.add_argument("--presets", action="store_true",
+                        help="Also export one list per language set and per genre filter")
+    args = parser.parse_args()
+
+    n_titles, seconds = run(args.model, args.out, args.top_n, args.workers, args.chunk_size, args.presets)
+    print(f"✅ Exported {n_titles} titles to {args.out} in {seconds:.1f}s "
+          f"({n_titles / max(seconds, 1e-9):,.0f} titles/s)")
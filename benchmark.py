@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows: no max RSS in the report
+    resource = None
+
+import preprocess
+from utils import artifact
+from utils.catalog_index import build_catalog_index
+from utils.ann import DEFAULT_ENGINE, ENGINES, build_neighbors, recall_at_k
+from utils.recommender import recommend_movies
+from utils.synthetic_catalog import write_catalog
+
+# ------------------------------------------------------------------
+# Preprocess / recommend benchmarks on synthetic catalogs
+# ------------------------------------------------------------------
+#   python benchmark.py --sizes 10000 100000 --out bench/report.json
+#   python benchmark.py --sizes 10000 --baseline bench/report.json   # exits 1 on regressions
+#   python benchmark.py --sizes 1000000 --engine ivf --ann-nprobes 4 8 16 32
+#
+# Each preprocess stage is timed and (unless --no-memory) its peak Python
+# heap allocation is measured with tracemalloc, which includes numpy and
+# scipy buffers; recommendation latency is measured without it. The exact
+# similarity stage is quadratic in the catalog size, so 1M rows is opt-in
+# (and meant for --engine ivf): with the exact engine it takes hours.
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_QUERIES = 500
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA = 0.001  # seconds; smaller slowdowns (e.g. of sub-ms p50s) are timer noise
+
+
+class StageTimer:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        result = {"seconds": time.perf_counter() - start}
+        if self.memory:
+            result["peak_mb"] = (tracemalloc.get_traced_memory()[1] - before) / 2**20
+        self.stages[name] = result
+        print(f"    {name:<12} {result['seconds']:8.2f}s" +
+              (f" {result['peak_mb']:9.1f} MB" if self.memory else ""))
+
+
+def bench_preprocess(csv_path, model_dir, memory=True, engine=DEFAULT_ENGINE, engine_options=None, workers=None):
+    """The in-memory build of preprocess.run, one timed stage at a time.
+
+    "soup" builds the weighted soup of the whole catalog in this process;
+    "vectorize" is the parallel build, which cleans each chunk again in its
+    worker (whose memory tracemalloc doesn't see). Returns (stages,
+    manifest, vectors).
+    """
+    engine_options = engine_options or {}
+    timer = StageTimer(memory)
+    with timer.stage("read"):
+        df = preprocess.prepare(preprocess.read_catalog(csv_path))
+    with timer.stage("soup"):
+        soup = preprocess.build_soup(df)
+    del soup
+    with timer.stage("vectorize"):
+        vectors, vocabulary = preprocess.vectorize(df, workers=workers)
+    with timer.stage("similarity"):
+        neighbors = build_neighbors(vectors, engine, **engine_options)
+    with timer.stage("save"):
+        final_data = preprocess.movie_metadata(df).reset_index(drop=True)
+        catalog_index = build_catalog_index(final_data)
+        manifest = artifact.save_model(model_dir, final_data, neighbors, catalog_index, vectors, vocabulary,
+                                       extra={**preprocess.engine_summary(engine, engine_options),
+                                              "field_weights": preprocess.FIELD_WEIGHTS})
+    return timer.stages, manifest, vectors
+
+
+def bench_ann(vectors, nprobes, ks=(10, 100), sample=1000):
+    """Build time and recall@k of the ivf engine for each nprobe, against exact neighbors of a sample.
+
+    Only the sampled rows are solved exactly, so this also works at 1M rows.
+    """
+    results = []
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        index = build_neighbors(vectors, "ivf", nprobe=nprobe)
+        seconds = time.perf_counter() - start
+        result = {"nprobe": nprobe, "build_seconds": seconds}
+        for k in ks:
+            result[f"recall@{k}"] = recall_at_k(index, vectors, k, sample)
+        results.append(result)
+        print(f"    ivf nprobe={nprobe:<4} {seconds:8.2f}s  " +
+              "  ".join(f"recall@{k} {result[f'recall@{k}']:.3f}" for k in ks))
+    return results
+
+
+def _latency_summary(samples):
+    ms = np.array(samples) * 1000
+    return {
+        "queries": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def bench_recommend(model_dir, n_queries=DEFAULT_QUERIES, seed=0):
+    """Model load time plus recommend_movies latency in both modes (no result cache)."""
+    start = time.perf_counter()
+    model = artifact.load_model(model_dir)
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    titles = model.index.sorted_titles
+    languages = model.index.languages
+    genres = model.index.genres
+
+    def filters():
+        return (rng.sample(languages, min(len(languages), rng.randint(0, 2))),
+                rng.sample(genres, min(len(genres), rng.randint(0, 2))))
+
+    modes = {
+        "exploration": [(None, *filters()) for _ in range(n_queries)],
+        "recommendation": [(rng.choice(titles), *filters()) for _ in range(n_queries)],
+    }
+    results = {"load_seconds": load_seconds}
+    for mode, queries in modes.items():
+        samples = []
+        for title, langs, genre_filter in queries:
+            start = time.perf_counter()
+            recommend_movies(model.movies, model.neighbors, model.index, title=title,
+                             target_languages=langs, target_genres=genre_filter, top_n=12)
+            samples.append(time.perf_counter() - start)
+        results[mode] = _latency_summary(samples)
+        print(f"    {mode:<14} p50 {results[mode]['p50_ms']:.2f} ms  p99 {results[mode]['p99_ms']:.2f} ms")
+    print(f"    model load     {load_seconds:.2f}s")
+    return results
+
+
+def _timings(report):
+    """Flat {metric: seconds} of a report, used for regression checks."""
+    flat = {}
+    for size, result in report["results"].items():
+        for stage, stats in result["preprocess"].items():
+            flat[f"{size}/preprocess/{stage}"] = stats["seconds"]
+        flat[f"{size}/load"] = result["recommend"]["load_seconds"]
+        for mode in ("exploration", "recommendation"):
+            flat[f"{size}/{mode}/p50"] = result["recommend"][mode]["p50_ms"] / 1000
+    return flat
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA):
+    """Metrics more than `tolerance` and `min_delta` seconds slower than in `baseline`, as [(name, old, new)]."""
+    old, new = _timings(baseline), _timings(report)
+    return [(name, old[name], new[name]) for name in sorted(new.keys() & old.keys())
+            if new[name] > old[name] * (1 + tolerance) and new[name] - old[name] > min_delta]
+
+
+def run(sizes=DEFAULT_SIZES, out="benchmark_report.json", n_queries=DEFAULT_QUERIES, memory=True,
+        workdir=None, seed=0, engine=DEFAULT_ENGINE, engine_options=None, ann_nprobes=(), workers=None):
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": workers or os.cpu_count(),
+        "engine": preprocess.engine_summary(engine, engine_options or {})["neighbor_engine"],
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for n_rows in sizes:
+            print(f"[{n_rows:,} rows]")
+            csv_path = write_catalog(Path(tmp) / f"catalog_{n_rows}.csv", n_rows, seed)
+            model_dir = Path(tmp) / f"model_{n_rows}"
+            if memory:
+                tracemalloc.start()
+            stages, manifest, vectors = bench_preprocess(csv_path, model_dir, memory, engine, engine_options,
+                                                         workers)
+            if memory:
+                tracemalloc.stop()  # it would also slow down the latency measurements
+            report["results"][str(n_rows)] = {
+                "preprocess": stages,
+                "artifact_mb": sum(f["bytes"] for f in manifest["files"].values()) / 2**20,
+                "recommend": bench_recommend(model_dir, n_queries, seed),
+            }
+            if ann_nprobes:
+                report["results"][str(n_rows)]["ann"] = bench_ann(vectors, ann_nprobes)
+    if resource is not None:
+        report["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing and recommendations on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Catalog sizes (rows); add 1000000 with --engine ivf")
+    parser.add_argument("--out", type=Path, default=Path("benchmark_report.json"), help="JSON report path")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="recommend_movies calls per mode")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (it slows pandas down)")
+    parser.add_argument("--workdir", type=Path, default=None, help="Where to put the temporary CSVs and models")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help="Neighbor engine for the similarity stage (use ivf for 1M rows)")
+    parser.add_argument("--nprobe", type=int, default=None, help="ivf: clusters searched per movie")
+    parser.add_argument("--ann-nprobes", type=int, nargs="*", default=[],
+                        help="Also sweep these ivf nprobe values and report build time and recall@10/@100")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown vs. the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA * 1000,
+                        help="Slowdowns smaller than this are never flagged, whatever the percentage")
+    parser.add_argument("--workers", type=int, default=None, help="Vectorizer processes (default: all cores)")
+    args = parser.parse_args()
+
+    engine_options = {"nprobe": args.nprobe} if args.engine == "ivf" and args.nprobe else {}
+    report = run(args.sizes, args.out, args.queries, not args.no_memory, args.workdir,
+                 engine=args.engine, engine_options=engine_options, ann_nprobes=args.ann_nprobes,
+                 workers=args.workers)
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance,
+                              args.min_delta_ms / 1000)
+        for name, old, new in regressions:
+            print(f"❌ {name}: {old:.4f}s -> {new:.4f}s")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against", args.baseline)
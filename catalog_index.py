@@ -0,0 +1,271 @@
+import numpy as np
+
+from utils.leaderboards import DEFAULT_LANGUAGE_SETS, build_leaderboards
+
+
+class CatalogIndex:
+    """Precomputed lookups and integer-coded columns used by recommend_movies and app.py.
+
+    title_rows      -> {title: row} for the first movie with that title
+    language_rows   -> {language: sorted int32 rows}
+    genre_rows      -> {genre: sorted int32 rows}
+    sorted_titles   -> every title, sorted, for the search dropdown
+    display_genres  -> Title-cased genre names, sorted, for the sidebar filter
+    lang_codes      -> (N,) int16 position in `languages`
+    genre_masks     -> (N,) uint64 bitmask, bit b set when the movie has `genres[b]`
+    genre_offsets   -> (N + 1,) int32 CSR offsets into `genre_values`
+    genre_values    -> int32 positions in `genres`, in the movie's own order
+    director_codes  -> (N,) int32 position in `directors`, -1 when unknown
+    cast_offsets    -> (N + 1,) int32 CSR offsets into `cast_values` (int64 past 2**31 entries)
+    cast_values     -> int32 positions in `cast`
+    vote_counts     -> (N,) int32 vote counts
+    vote_averages   -> (N,) float32 ratings
+    leaderboards    -> {(sorted languages, genre or None): ranked int32 rows}, see leaderboards.py
+    """
+
+    def __init__(self, title_rows, sorted_titles, languages, lang_codes, language_rows,
+                 genres, genre_masks, genre_rows, genre_offsets, genre_values, display_genres,
+                 directors, director_codes, cast, cast_offsets, cast_values,
+                 vote_counts, vote_averages, leaderboards=None):
+        self.title_rows = title_rows
+        self.sorted_titles = sorted_titles
+        self.language_rows = language_rows
+        self.genre_rows = genre_rows
+        self.display_genres = display_genres
+        self.languages = languages
+        self.lang_codes = lang_codes
+        self.genres = genres
+        self.genre_masks = genre_masks
+        self.genre_offsets = genre_offsets
+        self.genre_values = genre_values
+        self.directors = directors
+        self.director_codes = director_codes
+        self.cast = cast
+        self.cast_offsets = cast_offsets
+        self.cast_values = cast_values
+        self.vote_counts = vote_counts
+        self.vote_averages = vote_averages
+        self.leaderboards = leaderboards if leaderboards is not None else {}
+
+        self.language_ids = {lang: i for i, lang in enumerate(languages)}
+        self.genre_ids = {g: i for i, g in enumerate(genres)}
+
+    def __len__(self):
+        return len(self.lang_codes)
+
+    def row_of(self, title):
+        """Row of `title`, or None when it is not in the catalog."""
+        return self.title_rows.get(title)
+
+    def rows_for(self, languages=None, genres=None):
+        """Sorted rows in any of `languages` and any of `genres` (None/empty = no filter)."""
+        rows = None
+        if languages:
+            rows = _union([self.language_rows.get(l) for l in languages])
+        if genres:
+            genre_rows = _union([self.genre_rows.get(g) for g in genres])
+            rows = genre_rows if rows is None else np.intersect1d(rows, genre_rows, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(self), dtype=np.int32)
+        return rows
+
+    def language_codes_for(self, languages):
+        """Codes of the known languages in `languages` (unknown ones are dropped)."""
+        return np.array([self.language_ids[l] for l in languages if l in self.language_ids], dtype=np.int16)
+
+    def genre_mask_for(self, genres):
+        """Bitmask of the known genres in `genres` (unknown ones are dropped)."""
+        mask = 0
+        for g in genres:
+            if g in self.genre_ids:
+                mask |= 1 << self.genre_ids[g]
+        return np.uint64(mask)
+
+    def genres_of(self, row):
+        """Genre names of `row` (the old genres_list column)."""
+        values = self.genre_values[self.genre_offsets[row]:self.genre_offsets[row + 1]]
+        return [self.genres[v] for v in values]
+
+    def cast_of(self, row):
+        return self.cast_values[self.cast_offsets[row]:self.cast_offsets[row + 1]]
+
+    def cast_names_of(self, row):
+        """Cleaned cast names of `row` (the old cast_list column)."""
+        return [self.cast[v] for v in self.cast_of(row)]
+
+    def shares_cast(self, row, rows):
+        """Boolean array: does each of `rows` share at least one cast entry with `row`?"""
+        rows = np.asarray(rows)
+        starts = self.cast_offsets[rows]
+        lengths = self.cast_offsets[rows + 1] - starts
+        if not len(rows) or not lengths.sum():
+            return np.zeros(len(rows), dtype=bool)
+
+        # Flatten every candidate's cast segment, then count hits per owner.
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        flat = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        hits = np.isin(self.cast_values[flat], self.cast_of(row))
+        return np.bincount(owner[hits], minlength=len(rows)) > 0
+
+
+class TextColumn:
+    """Read-only column of long strings (e.g. overviews) decoded on access.
+
+    The text lives in one UTF-8 byte array that is usually memory-mapped, so
+    only the pages of rows actually shown are ever read into memory.
+
+    data    -> uint8 UTF-8 bytes of every row, concatenated
+    offsets -> (N + 1,) int64 offsets into `data`
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+
+def encode_texts(texts):
+    """Strings -> (uint8 UTF-8 bytes, int64 offsets) for a TextColumn."""
+    encoded = [str(t).encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def csr_offsets(lengths):
+    """CSR offsets for per-row `lengths`: int32 unless the total overflows it."""
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    return offsets.astype(np.int32 if offsets[-1] < 2 ** 31 else np.int64)
+
+
+def title_lookup(titles):
+    """{title: row} keeping the first row of duplicated titles."""
+    title_rows = {}
+    for row, title in enumerate(titles):
+        title_rows.setdefault(title, row)
+    return title_rows
+
+
+def _union(postings):
+    postings = [p for p in postings if p is not None]
+    if not postings:
+        return np.zeros(0, dtype=np.int32)
+    return np.unique(np.concatenate(postings))
+
+
+class _Coder:
+    """Assigns provisional codes in first-seen order; `finish` remaps them to sorted order."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def encode(self, values):
+        ids = self.ids
+        return np.array([ids.setdefault(v, len(ids)) for v in values], dtype=np.int64)
+
+    def finish(self):
+        vocab = sorted(self.ids)
+        remap = np.zeros(len(vocab), dtype=np.int32)
+        for final, value in enumerate(vocab):
+            remap[self.ids[value]] = final
+        return vocab, remap
+
+
+class CatalogIndexBuilder:
+    """Builds a CatalogIndex one DataFrame chunk at a time.
+
+    Only integer codes are kept between chunks, so memory does not depend on
+    how much text the catalog carries.
+    """
+
+    def __init__(self):
+        self.titles = []
+        self._languages = _Coder()
+        self._genres = _Coder()
+        self._directors = _Coder()
+        self._cast = _Coder()
+        self._lang_codes = []
+        self._director_codes = []
+        self._genre_lengths = []
+        self._genre_values = []
+        self._cast_lengths = []
+        self._cast_values = []
+        self._vote_counts = []
+        self._vote_averages = []
+
+    def add(self, df):
+        self.titles.extend(df["title"].astype(str).tolist())
+        self._lang_codes.append(self._languages.encode(df["original_language"].astype(str).tolist()))
+        self._director_codes.append(self._directors.encode(df["director_clean"].astype(str).tolist()))
+
+        genre_lists = df["genres_list"].tolist()
+        self._genre_lengths.append(np.array([len(g) for g in genre_lists], dtype=np.int64))
+        self._genre_values.append(self._genres.encode([g for sub in genre_lists for g in sub]))
+
+        cast_lists = df["cast_list"].tolist()
+        self._cast_lengths.append(np.array([len(c) for c in cast_lists], dtype=np.int64))
+        self._cast_values.append(self._cast.encode([name for sub in cast_lists for name in sub]))
+
+        self._vote_counts.append(df["vote_count"].to_numpy(dtype=np.int64))
+        self._vote_averages.append(df["vote_average"].to_numpy(dtype=np.float64))
+        return self
+
+    def build(self, language_sets=DEFAULT_LANGUAGE_SETS):
+        n = len(self.titles)
+        title_rows = title_lookup(self.titles)
+
+        languages, remap = self._languages.finish()
+        lang_codes = remap[_concat(self._lang_codes)].astype(np.int16)
+        language_rows = {lang: np.flatnonzero(lang_codes == i).astype(np.int32) for i, lang in enumerate(languages)}
+
+        genres, remap = self._genres.finish()
+        if len(genres) > 64:
+            raise ValueError(f"Genre bitmask supports at most 64 genres, catalog has {len(genres)}")
+        genre_values = remap[_concat(self._genre_values)]
+        genre_lengths = _concat(self._genre_lengths)
+        genre_owner = np.repeat(np.arange(n), genre_lengths)
+        genre_masks = np.zeros(n, dtype=np.uint64)
+        np.bitwise_or.at(genre_masks, genre_owner, np.left_shift(np.uint64(1), genre_values.astype(np.uint64)))
+        genre_rows = {g: np.unique(genre_owner[genre_values == i]).astype(np.int32) for i, g in enumerate(genres)}
+        display_genres = sorted({g.title() for g in genres if g})
+
+        # Empty director means "unknown" and must never earn the director boost.
+        all_directors, remap = self._directors.finish()
+        directors = [d for d in all_directors if d]
+        if len(directors) != len(all_directors):
+            remap = np.where(remap == 0, -1, remap - 1).astype(np.int32)  # "" always sorts first
+        director_codes = remap[_concat(self._director_codes)]
+
+        # Cast lists are kept verbatim (including "" entries) so the shared-cast
+        # boost behaves exactly like the original set intersection.
+        cast, remap = self._cast.finish()
+        cast_values = remap[_concat(self._cast_values)].astype(np.int32)
+        cast_offsets = csr_offsets(_concat(self._cast_lengths))
+
+        index = CatalogIndex(
+            title_rows, sorted(self.titles), languages, lang_codes, language_rows,
+            genres, genre_masks, genre_rows, csr_offsets(genre_lengths), genre_values.astype(np.int32),
+            display_genres, directors, director_codes, cast, cast_offsets, cast_values,
+            _concat(self._vote_counts).astype(np.int32),
+            np.concatenate(self._vote_averages).astype(np.float32) if self._vote_averages else np.zeros(0, np.float32),
+        )
+        # Exploration-mode results for the common filters, ranked once here
+        index.leaderboards = build_leaderboards(index, language_sets)
+        return index
+
+
+def _concat(parts):
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+def build_catalog_index(df):
+    """Builds a CatalogIndex from the preprocessed movie DataFrame."""
+    return CatalogIndexBuilder().add(df).build()
@@ -0,0 +1,126 @@
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from utils.artifact import ArtifactError, current_version, load_model
+from utils.recommender import recommend_rows
+
+DEFAULT_INTERVAL = 10.0
+
+
+def validate(model):
+    """Raises ArtifactError unless every part of `model` covers the same rows.
+
+    Also runs one query against each structure, so a fresh version has its
+    first pages in memory before any session is switched to it.
+    """
+    n_rows = len(model.movies)
+    sizes = {"neighbors": len(model.neighbors), "index": len(model.index),
+             "resolver": len(model.resolver.normalized), "overviews": len(model.overviews)}
+    wrong = {name: size for name, size in sizes.items() if size != n_rows}
+    if wrong:
+        raise ArtifactError(f"{model.version}: {n_rows} movies but {wrong}")
+    if n_rows:
+        row = int(np.argmax(model.index.vote_counts))
+        title = str(model.movies["title"].iat[row])
+        recommend_rows(model.neighbors, model.index, title, top_n=10)
+        recommend_rows(model.neighbors, model.index, None, top_n=10)
+        model.resolver.resolve(title)
+        model.overviews[row]
+
+
+class ModelReloader:
+    """Serves the artifact version CURRENT points to, swapping in new ones without a restart.
+
+    A daemon thread loads the current version, then polls CURRENT every
+    `interval` seconds. A newly published version is loaded and validated
+    in the background and then replaces the served one in a single
+    assignment: callers that already took a model from result() keep it
+    for as long as they hold it, and the old version's memory maps are
+    released once the last of them lets go. A version that fails to load
+    is skipped and the previous one keeps serving.
+    """
+
+    def __init__(self, root, interval=DEFAULT_INTERVAL, loader=load_model, name="model-reload"):
+        self.root = root
+        self.interval = interval
+        self.model = None
+        self.error = None  # why the last new version was rejected
+        self.swaps = 0
+        self.started_at = time.perf_counter()
+        self.seconds = None  # first load
+        self._loader = loader
+        self._failed_version = None
+        self._retired = []  # (version, weakref to its neighbor index)
+        self._first = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self.check()
+        self.seconds = time.perf_counter() - self.started_at
+        self._first.set()
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Loads, validates and swaps in the current version if it is new; returns True on a swap."""
+        version = None
+        try:
+            version = current_version(self.root)
+            if version is None:
+                raise FileNotFoundError(f"No model artifact published in {self.root}")
+            if self.model is not None and version == self.model.version:
+                self.error = self._failed_version = None  # e.g. CURRENT rolled back after a bad publish
+                return False
+            if version == self._failed_version:
+                return False
+            start = time.perf_counter()
+            model = self._loader(self.root, version)
+            validate(model)
+        except Exception as e:
+            self.error = e
+            self._failed_version = version
+            if version is not None:
+                print(f"Model version {version} rejected: {e}")
+            return False
+
+        old = self.model
+        self.model = model
+        self.error = None
+        self._failed_version = None
+        self.swaps += 1
+        if old is not None:
+            self._retired = self._in_use() + [(old.version, weakref.ref(old.neighbors))]
+            print(f"Model version {old.version} -> {model.version} ({time.perf_counter() - start:.1f}s to load)")
+        return True
+
+    def ready(self):
+        return self._first.is_set()
+
+    def result(self, timeout=None):
+        """The model to use for one rerun or request; waits for the first load."""
+        if not self._first.wait(timeout):
+            raise TimeoutError(f"still loading after {timeout}s")
+        model = self.model
+        if model is None:
+            raise self.error
+        return model
+
+    def _in_use(self):
+        # Retired versions drop out once nothing references them anymore
+        return [(version, ref) for version, ref in self._retired if ref() is not None]
+
+    def stats(self):
+        return {
+            "version": self.model.version if self.model is not None else None,
+            "swaps": self.swaps,
+            "retired_in_use": [version for version, _ in self._in_use()],
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,374 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Timing spans, per-rerun / per-session aggregates and profiling hooks
+# ------------------------------------------------------------------
+# Configured from the environment (see Instrumentation.from_env):
+#   CINEMATCH_TIMING_LOG      JSON line per rerun to this file ("-" = stderr)
+#   CINEMATCH_METRICS_PORT    serve Prometheus text on http://127.0.0.1:PORT/metrics
+#   CINEMATCH_METRICS_HOST    interface for the metrics server (default 127.0.0.1)
+#   CINEMATCH_PROFILE         "cprofile" or "sample" to profile every rerun
+#   CINEMATCH_PROFILE_DIR     where profiles go (default: profiles/)
+
+logger = logging.getLogger("cinematch.timing")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+SESSION_KEY = "_instrumentation"
+
+
+class SpanStats:
+    """Count, total and worst time of one span name."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        return {"count": self.count, "total_s": round(self.total, 6), "max_s": round(self.max, 6),
+                "mean_s": round(self.total / self.count, 6) if self.count else 0.0}
+
+
+class Registry:
+    """Process-wide span histograms, shared by every session and rendered for Prometheus."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.reruns = Counter()
+        self._histograms = {}  # name -> [count per bucket..., +Inf], SpanStats
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            entry = self._histograms.get(name)
+            if entry is None:
+                entry = self._histograms[name] = ([0] * (len(self.buckets) + 1), SpanStats())
+            counts, stats = entry
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            stats.add(seconds)
+
+    def count_rerun(self, status):
+        with self._lock:
+            self.reruns[status] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, (_, stats) in self._histograms.items()}
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP cinematch_span_seconds Time spent in instrumented stages.",
+            "# TYPE cinematch_span_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                counts, stats = self._histograms[name]
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f'cinematch_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'cinematch_span_seconds_sum{{span="{name}"}} {stats.total}')
+                lines.append(f'cinematch_span_seconds_count{{span="{name}"}} {stats.count}')
+            lines += [
+                "# HELP cinematch_reruns_total Script reruns by outcome.",
+                "# TYPE cinematch_reruns_total counter",
+            ]
+            lines += [f'cinematch_reruns_total{{status="{s}"}} {n}' for s, n in sorted(self.reruns.items())]
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------------
+# Profilers (one per rerun, only for the thread running the script)
+# ------------------------------------------------------------------
+_cprofile_lock = threading.Lock()
+
+
+class CProfiler:
+    """Deterministic profile of one rerun, saved as a .prof file (snakeviz, pstats).
+
+    Only one cProfile can run per process, so concurrent reruns skip it.
+    """
+
+    suffix = ".prof"
+
+    def __init__(self):
+        self._profile = None
+
+    def start(self):
+        if _cprofile_lock.acquire(blocking=False):
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self, path):
+        if self._profile is None:
+            return None
+        try:
+            self._profile.disable()
+        finally:
+            _cprofile_lock.release()
+        self._profile.dump_stats(path)
+        return path
+
+
+class SamplingProfiler:
+    """Low-overhead stack sampler for one thread, saved in collapsed-stack format.
+
+    Each line is "file:function;file:function count", ready for flamegraph.pl
+    or speedscope.
+    """
+
+    suffix = ".folded"
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(target,), name="sampler", daemon=True)
+        self._thread.start()
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        if not self.stacks:
+            return None
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+PROFILERS = {"cprofile": CProfiler, "sample": SamplingProfiler}
+
+
+# ------------------------------------------------------------------
+# Reruns
+# ------------------------------------------------------------------
+class Rerun:
+    """Spans of one script run; use `with rerun.span("name"):` around each stage.
+
+    Use the rerun itself as a context manager around the whole script body:
+    st.stop(), st.rerun(), a newer rerun request and a closed session all
+    unwind the script with an exception, and the rerun (with its profiler)
+    is finished right there instead of waiting for the session's next run.
+    """
+
+    def __init__(self, instrumentation, session):
+        self.instrumentation = instrumentation
+        self.session = session
+        session["reruns"] += 1
+        self.number = session["reruns"]
+        self.spans = []
+        self.finished = False
+        self.profiler = instrumentation.new_profiler()
+        if self.profiler is not None:
+            self.profiler.start()
+        self._start = self._last = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            # Streamlit's stop/rerun control flow derives from BaseException, real errors from Exception
+            self.finish("error" if issubclass(exc_type, Exception) else "interrupted")
+        return False
+
+    def record(self, name, seconds):
+        self._last = time.perf_counter()
+        self.spans.append((name, seconds))
+        self.instrumentation.registry.observe(name, seconds)
+        self.session["spans"].setdefault(name, SpanStats()).add(seconds)
+
+    def finish(self, status="complete", end=None):
+        """Closes the rerun: aggregates, logs and stores the profile. Safe to call twice."""
+        if self.finished:
+            return
+        self.finished = True
+        end = end if end is not None else time.perf_counter()
+        self.record("rerun", end - self._start)
+        self.instrumentation.registry.count_rerun(status)
+
+        profile = None
+        if self.profiler is not None:
+            path = self.instrumentation.profile_path(self.session["id"], self.number, self.profiler.suffix)
+            profile = self.profiler.stop(path)
+
+        if logger.isEnabledFor(logging.INFO):
+            spans = {}
+            for name, seconds in self.spans:
+                spans[name] = round(spans.get(name, 0.0) + seconds, 6)
+            logger.info(json.dumps({
+                "ts": time.time(),
+                "session": self.session["id"],
+                "rerun": self.number,
+                "status": status,
+                "spans": spans,
+                "session_totals": {name: s.as_dict() for name, s in self.session["spans"].items()},
+                "profile": str(profile) if profile else None,
+            }))
+
+
+class Instrumentation:
+    """Creates Rerun recorders and owns the process-wide Registry."""
+
+    def __init__(self, registry=None, profile=None, profile_dir="profiles",
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        if profile and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profile!r}, expected one of {sorted(PROFILERS)}")
+        self.registry = registry or Registry()
+        self.profile = profile
+        self.profile_dir = Path(profile_dir)
+        self.sample_interval = sample_interval
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Instrumentation configured by the CINEMATCH_* variables listed above."""
+        instrumentation = cls(profile=environ.get("CINEMATCH_PROFILE") or None,
+                              profile_dir=environ.get("CINEMATCH_PROFILE_DIR", "profiles"))
+        log_path = environ.get("CINEMATCH_TIMING_LOG")
+        if log_path:
+            log_to(log_path)
+        port = environ.get("CINEMATCH_METRICS_PORT")
+        if port:
+            start_metrics_server(instrumentation.registry, int(port),
+                                 environ.get("CINEMATCH_METRICS_HOST", "127.0.0.1"))
+        return instrumentation
+
+    def new_profiler(self):
+        if self.profile == "sample":
+            return SamplingProfiler(self.sample_interval)
+        if self.profile == "cprofile":
+            return CProfiler()
+        return None
+
+    def profile_path(self, session_id, number, suffix):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        return self.profile_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{session_id[:8]}-{number}{suffix}"
+
+    def start_rerun(self, session_state):
+        """Begins a rerun for a session (e.g. st.session_state).
+
+        A previous rerun that was never finished (it didn't run inside
+        `with rerun:`) is closed as "interrupted", without the idle time since
+        its last span.
+        """
+        session = session_state.get(SESSION_KEY)
+        if session is None:
+            session = {"id": uuid.uuid4().hex, "reruns": 0, "spans": {}, "open": None}
+            session_state[SESSION_KEY] = session
+        if session["open"] is not None:
+            session["open"].finish("interrupted", end=session["open"]._last)
+        rerun = Rerun(self, session)
+        session["open"] = rerun
+        return rerun
+
+
+def session_summary(session_state):
+    """Per-session span aggregates, e.g. for a debug panel."""
+    session = session_state.get(SESSION_KEY)
+    if session is None:
+        return {}
+    return {name: stats.as_dict() for name, stats in session["spans"].items()}
+
+
+_log_handlers = {}  # path -> handler
+_metrics_servers = {}  # (host, port) -> server
+_setup_lock = threading.Lock()
+
+
+def log_to(path):
+    """Writes one JSON line per rerun to `path` ("-" for stderr); calling it again for a path is a no-op."""
+    with _setup_lock:
+        key = path if path == "-" else str(Path(path).resolve())
+        if key in _log_handlers:
+            return _log_handlers[key]
+        handler = logging.StreamHandler(sys.stderr) if path == "-" else logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _log_handlers[key] = handler
+        return handler
+
+
+def start_metrics_server(registry, port, host="127.0.0.1"):
+    """Serves `registry` as Prometheus text on /metrics from a daemon thread.
+
+    Once per (host, port): a later call only switches the served registry.
+    """
+    with _setup_lock:
+        server = _metrics_servers.get((host, port))
+        if server is not None:
+            server.registry = registry
+            return server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = self.server.registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        server.registry = registry
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        _metrics_servers[(host, port)] = server
+        return server
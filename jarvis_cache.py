@@ -0,0 +1,181 @@
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer
+
+from utils.sqlite_store import SQLiteStore
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5_000
+DEFAULT_THRESHOLD = 0.8  # cosine between prompts' term counts
+MAX_CANDIDATES = 50
+
+# Words that flip a prompt's meaning; kept as terms instead of dropped as stop words
+QUALIFIERS = frozenset({"not", "no", "nor", "never", "with", "without", "before", "after", "since", "until",
+                        "over", "under", "above", "below", "more", "less", "first", "last"})
+
+# English stop words minus the qualifiers; single characters and numbers are kept
+_analyze = CountVectorizer(stop_words=list(ENGLISH_STOP_WORDS - QUALIFIERS),
+                           token_pattern=r"(?u)\b\w+\b").build_analyzer()
+
+
+def normalize_prompt(prompt):
+    """'  Best MARATHI movies?? ' -> 'best marathi movies' (case, accents, punctuation, spacing)."""
+    prompt = unicodedata.normalize("NFKD", str(prompt))
+    prompt = "".join(c for c in prompt if not unicodedata.combining(c)).casefold()
+    return re.sub(r"[^\w]+", " ", prompt).strip()
+
+
+def stem(term):
+    """Folds plurals: 'comedies' and 'comedy' -> 'comedy', 'movies' and 'movie' -> 'movy'."""
+    if len(term) > 3 and term.endswith("s") and not term.endswith(("ss", "us", "is")):
+        term = term[:-1]
+    if term.endswith("ie"):
+        term = term[:-2] + "y"
+    return term
+
+
+def prompt_terms(prompt):
+    """Bag of words of a prompt: {term: count}, stop words dropped and plurals folded."""
+    return Counter(stem(term) for term in _analyze(normalize_prompt(prompt)))
+
+
+def cosine(a, b):
+    dot = sum(count * b.get(term, 0) for term, count in a.items())
+    if not dot:
+        return 0.0
+    return dot / math.sqrt(sum(c * c for c in a.values()) * sum(c * c for c in b.values()))
+
+
+def _json_default(value):
+    if hasattr(value, "item"):  # numpy scalars, e.g. float32 ratings on catalog cards
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class JarvisCache:
+    """SQLite-backed cache of Jarvis answers (and their resolved cards) keyed by prompt.
+
+    A prompt is looked up by its normalized text first; otherwise an earlier
+    prompt with exactly the same terms (see `prompt_terms`) is reused when
+    the cosine of their term counts is at or above `threshold`. So "What are
+    the best horror movies?" hits "best horror movie", but one extra or
+    missing word ("best horror comedy movies", "horror movies without
+    gore", "top 5 horror movies") is a miss.
+    Shared by threads, sessions and processes through an SQLiteStore, like
+    TMDBCache; entries expire after `ttl` and the least recently used ones
+    are evicted past `max_entries`.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, threshold=DEFAULT_THRESHOLD):
+        self._store = SQLiteStore(path, max_entries)
+        self.path = self._store.path
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._store.conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    terms TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, key TEXT NOT NULL, "
+                         "PRIMARY KEY (term, key))")
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, prompt):
+        """Cached value for `prompt` or a near-duplicate of it, else None."""
+        key = normalize_prompt(prompt)
+        if not key:
+            return None
+        now = time.time()
+        conn = self._store.conn()
+
+        row = conn.execute("SELECT payload FROM entries WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        if row is not None:
+            self._count("hits")
+            return self._touch(conn, key, row[0], now)
+
+        best_key, best_payload = self._nearest(conn, prompt_terms(prompt), now)
+        if best_key is None:
+            self._count("misses")
+            return None
+        self._count("near_hits")
+        return self._touch(conn, best_key, best_payload, now)
+
+    def _nearest(self, conn, terms, now):
+        if not terms:
+            return None, None
+        marks = ",".join("?" * len(terms))
+        candidates = conn.execute(
+            f"SELECT e.key, e.terms, e.payload FROM entries e JOIN ("
+            f"  SELECT key, COUNT(*) AS shared FROM terms WHERE term IN ({marks})"
+            f"  GROUP BY key ORDER BY shared DESC LIMIT ?"
+            f") t ON t.key = e.key WHERE e.expires_at > ?",
+            (*terms, MAX_CANDIDATES, now),
+        ).fetchall()
+
+        best_key, best_payload, best_score = None, None, self.threshold
+        for key, cached_terms, payload in candidates:
+            cached_terms = json.loads(cached_terms)
+            if cached_terms.keys() != terms.keys():
+                continue
+            score = cosine(terms, cached_terms)
+            if score >= best_score:
+                best_key, best_payload, best_score = key, payload, score
+        return best_key, best_payload
+
+    def _touch(self, conn, key, payload, now):
+        with conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(payload)
+
+    def put(self, prompt, value):
+        """Stores a JSON-serializable value (numpy scalars are converted) for `prompt`."""
+        key = normalize_prompt(prompt)
+        if not key:
+            return
+        now = time.time()
+        terms = prompt_terms(prompt)
+        payload = json.dumps(value, default=_json_default)
+        conn = self._store.conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                         (key, json.dumps(terms), payload, now + self.ttl, now))
+            conn.execute("DELETE FROM terms WHERE key = ?", (key,))
+            conn.executemany("INSERT INTO terms VALUES (?, ?)", [(term, key) for term in terms])
+            if self._store.evict(conn, now):
+                conn.execute("DELETE FROM terms WHERE key NOT IN (SELECT key FROM entries)")
+
+    def stats(self):
+        (entries,) = self._store.conn().execute("SELECT COUNT(*) FROM entries").fetchone()
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+    def clear(self):
+        with self._store.conn() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM terms")
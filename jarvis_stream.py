@@ -0,0 +1,154 @@
+import json
+import time
+from types import SimpleNamespace
+
+
+class JarvisStreamParser:
+    """Incremental parser for Jarvis' JSON answer while the completion streams in.
+
+    Expects {"response_text": "...", "recommendations": [{...}, ...]} in
+    any key order. feed() takes raw text as it arrives and returns the events
+    it completes: ("text", new characters of response_text) and
+    ("recommendation", dict) for every finished recommendation object.
+    close() returns the whole answer, like json.loads of the full completion.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+        self.recommendations = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._after_colon = False
+        self._key = None
+        self._text_start = None
+        self._item_start = None
+
+    def feed(self, piece):
+        self.buffer += piece
+        events = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._close_string(i, events)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._after_colon and self._key == "response_text":
+                    self._text_start = i + 1
+            elif c in "{[":
+                self._depth += 1
+                if c == "{" and self._depth == 3 and self._key == "recommendations":
+                    self._item_start = i
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._item_start is not None:
+                    self._add_item(buf[self._item_start:i + 1], events)
+                    self._item_start = None
+                self._depth -= 1
+            elif self._depth == 1 and c == ":":
+                self._after_colon = True
+            elif self._depth == 1 and c == ",":
+                self._after_colon = False
+        self._pos = len(buf)
+
+        if self._text_start is not None:
+            self._emit_text(buf[self._text_start:], events)
+        return events
+
+    def _close_string(self, i, events):
+        if self._depth != 1:
+            return
+        if not self._after_colon:
+            self._key = json.loads(self.buffer[self._string_start:i + 1])
+        elif self._text_start is not None:
+            self._emit_text(self.buffer[self._text_start:i], events)
+            self._text_start = None
+
+    def _emit_text(self, raw, events):
+        # Decode the longest prefix that does not end inside an escape sequence
+        while raw:
+            try:
+                decoded = json.loads(f'"{raw}"')
+                break
+            except ValueError:
+                raw = raw[:raw.rfind("\\")] if "\\" in raw else ""
+        else:
+            return
+        if len(decoded) > len(self.text):
+            events.append(("text", decoded[len(self.text):]))
+            self.text = decoded
+
+    def _add_item(self, raw, events):
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return
+        if isinstance(item, dict):
+            self.recommendations.append(item)
+            events.append(("recommendation", item))
+
+    def close(self):
+        start, end = self.buffer.find("{"), self.buffer.rfind("}")
+        try:
+            data = json.loads(self.buffer[start:end + 1])
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+        # Truncated or malformed completion: keep whatever streamed in completely
+        return {"response_text": self.text, "recommendations": self.recommendations}
+
+
+def parse_jarvis_stream(pieces):
+    """Yields JarvisStreamParser events for an iterable of text pieces, then ("done", answer)."""
+    parser = JarvisStreamParser()
+    for piece in pieces:
+        yield from parser.feed(piece)
+    yield "done", parser.close()
+
+
+def replay_answer(answer):
+    """The events of an already complete answer (cached or non-streamed), in the same shape."""
+    yield "text", answer.get("response_text", "")
+    for item in answer.get("recommendations") or []:
+        if isinstance(item, dict):
+            yield "recommendation", item
+    yield "done", answer
+
+
+class FakeGroqClient:
+    """Stands in for groq.Groq with a canned answer, streamed in `chunk_size` pieces.
+
+    Lets the Jarvis tab (and its streaming path) run offline, e.g.
+    CINEMATCH_FAKE_LLM=answer.json streamlit run app.py
+    """
+
+    def __init__(self, answer, chunk_size=8, delay=0.02):
+        self.answer = answer if isinstance(answer, str) else json.dumps(answer)
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, stream=False, **kwargs):
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))])
+        return self._stream()
+
+    def _stream(self):
+        for i in range(0, len(self.answer), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            delta = SimpleNamespace(content=self.answer[i:i + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+
+# Rows kept per leaderboard; larger top_n falls back to live ranking.
+LEADERBOARD_SIZE = 100
+
+# Language combinations offered by the sidebar (single languages are always
+# precomputed). Only these combinations are served without live ranking.
+DEFAULT_LANGUAGE_SETS = (("en", "hi"),)
+
+VOTE_COUNT_QUANTILE = 0.70
+
+
+def rank_rows(rows, vote_counts, vote_averages, top_n):
+    """Exploration ranking of `rows`: keep the top 30% by vote count, best rated first.
+
+    Equal ratings keep catalog order.
+    """
+    rows = np.asarray(rows)
+    if not len(rows):
+        return rows
+    counts = vote_counts[rows]
+    m = np.quantile(counts, VOTE_COUNT_QUANTILE)
+    qualified = rows[counts >= m]
+    if not len(qualified):
+        qualified = rows
+    order = np.lexsort((qualified, -vote_averages[qualified]))[:top_n]
+    return qualified[order]
+
+
+def leaderboard_key(languages, genre):
+    return tuple(sorted(set(languages or ()))), genre
+
+
+def build_leaderboards(index, language_sets=DEFAULT_LANGUAGE_SETS):
+    """Precomputes exploration results for every (language set, genre) filter.
+
+    Language sets are "no filter", every single language and
+    `language_sets`; genres are "no filter" and every single genre.
+    """
+    lang_keys = {()} | {(lang,) for lang in index.languages}
+    lang_keys |= {tuple(sorted(set(s))) for s in language_sets}
+    genre_keys = [None] + list(index.genres)
+
+    boards = {}
+    for langs, genre in itertools.product(sorted(lang_keys), genre_keys):
+        rows = index.rows_for(langs, [genre] if genre else None)
+        ranked = rank_rows(rows, index.vote_counts, index.vote_averages, LEADERBOARD_SIZE)
+        boards[(langs, genre)] = ranked.astype(np.int32)
+    return boards
+
+
+def explore(index, languages=None, genres=None, top_n=10):
+    """Top `top_n` exploration rows, served from a leaderboard when one matches."""
+    genres = sorted(set(genres or ()))
+    if len(genres) <= 1:
+        board = index.leaderboards.get(leaderboard_key(languages, genres[0] if genres else None))
+        if board is not None and (top_n <= len(board) or len(board) < LEADERBOARD_SIZE):
+            return board[:top_n]
+
+    # Rare combinations (several genres, unlisted language sets, huge top_n)
+    return rank_rows(index.rows_for(languages, genres), index.vote_counts, index.vote_averages, top_n)
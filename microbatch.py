@@ -0,0 +1,63 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.002  # seconds the first request of a batch waits for company
+
+
+class MicroBatcher:
+    """Coalesces concurrent calls into batches for one `handler(items) -> results` call.
+
+    A single background thread takes the first waiting item, gathers whatever
+    else arrives within `max_wait` seconds (up to `max_batch` items) and runs
+    the handler once for all of them. `submit` blocks the caller until its
+    own result is ready; a handler error is raised in every caller of that batch.
+    """
+
+    def __init__(self, handler, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="microbatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout=None):
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout)
+
+    def _loop(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    pending.append(self._queue.get(timeout=remaining) if remaining > 0
+                                   else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in pending]
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(pending, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+        }
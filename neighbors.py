@@ -0,0 +1,185 @@
+import numpy as np
+from scipy import sparse
+
+# Neighbors kept per movie. recommend_movies looks at top_n * 5 - 1 candidates,
+# so this covers top_n <= 20 (the Discover grid shows 12); see candidate_window.
+DEFAULT_TOP_K = 100
+
+# Upper bound for one dense (block_rows x N) similarity block.
+DEFAULT_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+class NeighborIndex:
+    """Top-K most similar movies per row, sorted by descending cosine similarity.
+
+    ids    -> (N, K) int32 row ids, padded with -1 when fewer than K exist
+    scores -> (N, K) float32 similarities matching `ids`
+    A movie is never listed as its own neighbor.
+    """
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def neighbors(self, idx, n=None):
+        """Returns (ids, scores) for row `idx`, best first, without padding."""
+        ids = self.ids[idx, :n]
+        scores = self.scores[idx, :n]
+        valid = ids >= 0
+        return ids[valid], scores[valid]
+
+
+def _normalized(vectors):
+    """L2-normalized float32 CSR copy of `vectors`.
+
+    scikit-learn is imported here, not at module level: it takes about a
+    second, and serving a prebuilt model only needs NeighborIndex.
+    """
+    from sklearn.preprocessing import normalize
+    return normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+
+
+def _block_rows(n_rows, block_bytes):
+    return max(1, int(block_bytes // (4 * max(n_rows, 1))))
+
+
+def select_top_k(cand_ids, cand_scores, k):
+    """Keeps the `k` best candidates of each row, sorted by descending score.
+
+    Ties are broken by lower row id, like a stable sort would. Candidates
+    scored -inf (the movie itself, padding) come back as id -1.
+    """
+    if k < cand_scores.shape[1]:
+        part = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+        # argpartition picks arbitrarily among scores tied with the k-th best;
+        # redo those (rare) rows so the lowest ids win.
+        kth = np.take_along_axis(cand_scores, part, axis=1).min(axis=1)
+        for r in np.flatnonzero((cand_scores >= kth[:, None]).sum(axis=1) > k):
+            cols = np.flatnonzero(cand_scores[r] >= kth[r])
+            part[r] = cols[np.lexsort((cand_ids[r, cols], -cand_scores[r, cols]))[:k]]
+        part_ids = np.take_along_axis(cand_ids, part, axis=1)
+        part_scores = np.take_along_axis(cand_scores, part, axis=1)
+    else:
+        part_ids, part_scores = cand_ids, cand_scores
+
+    order = np.lexsort((part_ids, -part_scores), axis=1)
+    ids = np.take_along_axis(part_ids, order, axis=1).astype(np.int32)
+    scores = np.take_along_axis(part_scores, order, axis=1).astype(np.float32)
+
+    missing = ~np.isfinite(scores)
+    ids[missing] = -1
+    scores[missing] = 0.0
+    return ids, scores
+
+
+def top_k_block(block, rows, k):
+    """Selects the top `k` columns of each row of a dense similarity block.
+
+    Row r of `block` is catalog row `rows[r]`; its self-similarity is ignored.
+    """
+    n_block, n_cols = block.shape
+    block[np.arange(n_block), rows] = -np.inf
+    return select_top_k(np.broadcast_to(np.arange(n_cols), block.shape), block, k)
+
+
+def effective_k(n_rows, k=DEFAULT_TOP_K):
+    """Neighbors per row actually stored for a catalog of `n_rows` movies."""
+    return max(0, min(k, n_rows - 1))
+
+
+def build_neighbor_index(vectors, k=DEFAULT_TOP_K, block_bytes=DEFAULT_BLOCK_BYTES, out=None):
+    """Builds a NeighborIndex from raw term-count vectors.
+
+    Similarity is computed one row block at a time so peak memory is
+    O(block_rows * N) instead of the O(N^2) of a full cosine_similarity call.
+    `out` may be a preallocated (e.g. memory-mapped) NeighborIndex of shape
+    (N, effective_k(N, k)); blocks are then written straight into it.
+    """
+    X = _normalized(vectors)
+    n = X.shape[0]
+    k = effective_k(n, k)
+
+    if out is None:
+        out = NeighborIndex(np.empty((n, k), dtype=np.int32), np.empty((n, k), dtype=np.float32))
+    ids, scores = out.ids, out.scores
+    if k == 0:
+        return out
+
+    XT = X.T.tocsc()
+    step = _block_rows(n, block_bytes)
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        block = (X[start:stop] @ XT).toarray()
+        ids[start:stop], scores[start:stop] = top_k_block(block, np.arange(start, stop), k)
+
+    return out
+
+
+def patch_neighbor_index(old, vectors, old_to_new, touched, k=DEFAULT_TOP_K, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Updates `old` for a catalog where only a few rows changed, without an all-pairs pass.
+
+    vectors    -> raw term-count vectors of the new catalog
+    old_to_new -> (N_old,) new row of every old row; -1 for deleted *and* changed
+                  rows, since their old scores are stale
+    touched    -> new rows whose vectors are new or changed
+
+    Untouched similarities never change, so a row whose list survived intact
+    only has to consider the touched rows as new candidates. Rows that lost a
+    neighbor (deleted or changed) and the touched rows themselves are
+    recomputed exactly. The result equals a full rebuild.
+    """
+    X = _normalized(vectors)
+    n = X.shape[0]
+    k = effective_k(n, k)
+    if k != old.k:
+        # Tiny catalogs whose K depends on N; a rebuild is cheap there anyway.
+        return build_neighbor_index(vectors, k=k, block_bytes=block_bytes)
+
+    old_to_new = np.asarray(old_to_new)
+    touched = np.asarray(touched, dtype=np.int64)
+    ids = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+
+    # 1. Carry surviving lists over, renumbered into the new catalog.
+    survivors = np.flatnonzero(old_to_new >= 0)
+    old_ids = np.asarray(old.ids[survivors])
+    mapped = np.where(old_ids >= 0, old_to_new[np.maximum(old_ids, 0)], -1).astype(np.int32)
+    lost = ((mapped < 0) & (old_ids >= 0)).any(axis=1)
+    ids[old_to_new[survivors]] = mapped
+    scores[old_to_new[survivors]] = np.asarray(old.scores[survivors])
+
+    recompute = np.zeros(n, dtype=bool)
+    recompute[old_to_new[survivors][lost]] = True
+    recompute[touched] = True
+    XT = X.T.tocsc()
+
+    # 2. Offer every touched row to every intact list.
+    intact = np.flatnonzero(~recompute)
+    if len(touched) and len(intact):
+        step = _block_rows(len(touched), block_bytes)
+        for start in range(0, len(intact), step):
+            rows = intact[start:start + step]
+            cand_scores = (X[rows] @ XT[:, touched]).toarray()
+            cand_ids = np.broadcast_to(touched.astype(np.int32), cand_scores.shape)
+            ids[rows], scores[rows] = select_top_k(
+                np.concatenate([ids[rows], cand_ids], axis=1),
+                np.concatenate([np.where(ids[rows] >= 0, scores[rows], -np.inf), cand_scores], axis=1),
+                k,
+            )
+
+    # 3. Recompute the rest exactly.
+    rows_to_recompute = np.flatnonzero(recompute)
+    step = _block_rows(n, block_bytes)
+    for start in range(0, len(rows_to_recompute), step):
+        rows = rows_to_recompute[start:start + step]
+        block = (X[rows] @ XT).toarray()
+        ids[rows], scores[rows] = top_k_block(block, rows, k)
+
+    return NeighborIndex(ids, scores)
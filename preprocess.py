@@ -1,78 +1,465 @@
+import argparse
+import multiprocessing
+import os
+from collections import deque
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import pickle
+from scipy import sparse
 from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from utils.neighbors import effective_k, patch_neighbor_index
+from utils.ann import DEFAULT_ENGINE, DEFAULT_NPROBE, ENGINES, build_neighbors
+from utils.catalog_index import CatalogIndexBuilder, build_catalog_index
+from utils.title_resolver import build_title_resolver
+from utils import artifact
 
 # ------------------------------------------------------------------
 # 1. Load Data
 # ------------------------------------------------------------------
 # Update path if necessary
-from pathlib import Path
-
 BASE_DIR = Path(__file__).resolve().parent
 DATA_PATH = BASE_DIR / "data" / "movie_db_READY_FOR_RECOMMENDER.csv"
-
-df = pd.read_csv(DATA_PATH, encoding="latin-1")
+MODEL_DIR = BASE_DIR / "utils" / "movie_model"
 
 cols = ["title", "overview", "genres", "keywords", "cast", "director",
         "vote_average", "vote_count", "original_language", "poster_url"]
 
-df = df[cols].fillna("")
-df["vote_average"] = pd.to_numeric(df["vote_average"], errors="coerce").fillna(0)
+# Read as strings so every chunk of a streamed CSV agrees on dtypes
+text_cols = ["title", "overview", "genres", "keywords", "cast", "director",
+             "original_language", "poster_url"]
+
+MAX_FEATURES = 5000
+STOP_WORDS = "english"
+DEFAULT_CHUNKSIZE = 50_000
+MIN_TASK_ROWS = 2_000  # smaller catalogs are vectorized without a process pool
+
+# 🟢 CRITICAL FIX: 'title' is part of the soup so "Thor" matches "Thor"
+# Term-count weight of every field in the tag soup. Each field is vectorized
+# on its own and its counts are scaled, which gives the same matrix as
+# repeating its text that many times (the old `* 5` soup string) without
+# tokenizing it five times. 0 leaves a field out.
+FIELD_WEIGHTS = {"title": 2, "genres": 4, "cast": 5, "director": 5, "keywords": 3, "overview": 1}
+# Names are squashed into single tokens ('Paresh Rawal' -> 'pareshrawal')
+ID_FIELDS = ("cast", "director")
+
+
+def read_catalog(path=DATA_PATH, chunksize=None):
+    """Whole CSV as one DataFrame, or an iterator of DataFrames when `chunksize` is set."""
+    return pd.read_csv(path, encoding="latin-1", usecols=cols,
+                       dtype={c: str for c in text_cols}, chunksize=chunksize)
+
+
+def prepare(df):
+    df = df[cols].fillna("")
+    df["vote_average"] = pd.to_numeric(df["vote_average"], errors="coerce").fillna(0)
+    df["vote_count"] = pd.to_numeric(df["vote_count"], errors="coerce").fillna(0).astype("int64")
+    return df
 
 # ------------------------------------------------------------------
 # 2. Robust Cleaning Functions
 # ------------------------------------------------------------------
-def clean_genre_list(x):
-    if not x: return []
-    x = str(x).lower().replace("|", ",")
-    return [i.strip() for i in x.split(",") if i.strip()]
+# Whole columns at a time with pandas string methods, no per-row Python calls.
+def clean_genre_lists(s):
+    """'Action|Science Fiction' -> ['action', 'science fiction']"""
+    return s.astype(str).str.lower().str.findall(r"[^,|\s](?:[^,|]*[^,|\s])?")
 
-def clean_id(x):
-    """'Paresh Rawal' -> 'pareshrawal'"""
-    if not x: return ""
-    return str(x).lower().replace(" ", "").replace(",", " ").replace("|", " ")
+def clean_ids(s):
+    """'Paresh Rawal, Akshay Kumar' -> 'pareshrawal akshaykumar'"""
+    return (s.astype(str).str.lower().str.replace(" ", "", regex=False)
+            .str.replace(",", " ", regex=False).str.replace("|", " ", regex=False))
 
-def clean_text(x):
-    """Simple text cleaner"""
-    return str(x).lower().replace("|", " ").replace(",", " ")
+def clean_id_lists(s):
+    """'Paresh Rawal|Akshay Kumar' -> ['pareshrawal', 'akshaykumar']"""
+    return (s.astype(str).str.lower().str.replace(" ", "", regex=False)
+            .str.replace("|", ",", regex=False).str.split(","))
 
 # ------------------------------------------------------------------
 # 3. Create Tag Soup (UPDATED)
 # ------------------------------------------------------------------
-# 🟢 CRITICAL FIX: Added 'title' to the soup so "Thor" matches "Thor"
-df["soup"] = (
-    (df["title"].apply(clean_text) + " ") * 2 +           # Title (Weight x2)
-    (df["genres"].apply(clean_text) + " ") * 4 +          # Genres
-    (df["cast"].apply(clean_id) + " ") * 5 +              # Cast (High Weight)
-    (df["director"].apply(clean_id) + " ") * 5 +          # Director
-    (df["keywords"].apply(clean_text) + " ") * 3 +
-    (df["overview"].apply(clean_text) + " ")
-)
+def build_soup(df, weights=FIELD_WEIGHTS):
+    """The tag soup of `df` as [(weight, documents)], one list of row documents per distinct weight.
+
+    Fields sharing a weight are joined into one document. Free-text fields
+    go in as they are: the vectorizer already lowercases and splits on '|'
+    and ','.
+    """
+    groups = {}
+    for field, weight in weights.items():
+        if weight:
+            text = clean_ids(df[field]) if field in ID_FIELDS else df[field].astype(str)
+            groups[weight] = text if weight not in groups else groups[weight] + " " + text
+    return [(weight, text.tolist()) for weight, text in groups.items()]
+
+
+def movie_metadata(df):
+    """Columns stored in the model artifact for the UI and recommend_movies."""
+    df = df.copy()
+    df["genres_list"] = clean_genre_lists(df["genres"])
+    df["director_clean"] = clean_ids(df["director"])
+    df["cast_list"] = clean_id_lists(df["cast"])
+
+    return df[[
+        "title", "poster_url", "original_language",
+        "vote_average", "vote_count", "overview",
+        "genres_list", "director_clean", "cast_list"
+    ]]
 
 # ------------------------------------------------------------------
 # 4. Vectorization
 # ------------------------------------------------------------------
-print("Vectorizing data...")
-cv = CountVectorizer(max_features=5000, stop_words="english")
-vectors = cv.fit_transform(df["soup"]).toarray()
-cosine_sim = cosine_similarity(vectors)
+def make_vectorizer(vocabulary=None):
+    """Fits its own vocabulary, or is stateless when given a fixed `vocabulary`."""
+    if vocabulary is None:
+        return CountVectorizer(max_features=MAX_FEATURES, stop_words=STOP_WORDS)
+    return CountVectorizer(vocabulary=vocabulary, stop_words=STOP_WORDS)
+
+
+def count_soup(soup):
+    """Weighted term counts of a build_soup() chunk over its own full vocabulary.
+
+    Every document is tokenized once: the weight groups are stacked and
+    their row blocks summed with their weights. Returns (float32 CSR matrix,
+    terms of its columns, corpus-wide float64 count per column).
+    """
+    n_rows = len(soup[0][1]) if soup else 0
+    cv = CountVectorizer(stop_words=STOP_WORDS)
+    try:
+        stacked = cv.fit_transform([doc for _, docs in soup for doc in docs]).astype(np.float32)
+    except ValueError:  # chunk without a single usable token
+        return sparse.csr_matrix((n_rows, 0), dtype=np.float32), np.array([], dtype=object), np.zeros(0)
+    counts = sum(stacked[i * n_rows:(i + 1) * n_rows] * np.float32(weight)
+                 for i, (weight, _) in enumerate(soup)).tocsr()
+    return counts, cv.get_feature_names_out(), np.asarray(counts.sum(axis=0, dtype=np.float64)).ravel()
+
+
+def add_totals(totals, terms, sums):
+    """Adds a chunk's per-term counts (see count_soup) to the corpus-wide `totals`."""
+    for term, total in zip(terms, sums.tolist()):
+        totals[term] = totals.get(term, 0) + total
+    return totals
+
+
+def select_vocabulary(totals, max_features=MAX_FEATURES):
+    """Same rule as CountVectorizer(max_features=...), ties included: most frequent terms, indexed alphabetically."""
+    terms = sorted(totals)
+    counts = np.array([totals[term] for term in terms], dtype=np.float64)
+    if np.array_equal(counts, np.round(counts)):
+        counts = counts.astype(np.int64)  # sorts exactly like CountVectorizer's integer term counts
+    if len(terms) > max_features:
+        keep = np.sort((-counts).argsort()[:max_features])
+        terms = [terms[i] for i in keep]
+    return {term: i for i, term in enumerate(terms)}
+
+
+def to_vocabulary(counts, terms, vocabulary):
+    """Re-indexes count_soup() columns to `vocabulary`, dropping terms outside it."""
+    cols = np.array([vocabulary.get(term, -1) for term in terms], dtype=np.int64)
+    keep = np.flatnonzero(cols >= 0)
+    kept = counts[:, keep].tocoo()
+    matrix = sparse.csr_matrix((kept.data, (kept.row, cols[keep][kept.col])),
+                               shape=(counts.shape[0], len(vocabulary)), dtype=np.float32)
+    matrix.sort_indices()
+    return matrix
+
+
+def featurize(soup, vocabulary):
+    """Weighted float32 term-count matrix of a build_soup() result against a fixed vocabulary."""
+    cv = make_vectorizer(vocabulary)
+    n_rows = len(soup[0][1]) if soup else 0
+    matrix = sparse.csr_matrix((n_rows, len(vocabulary)), dtype=np.float32)
+    for weight, docs in soup:
+        matrix = matrix + cv.transform(docs).astype(np.float32) * np.float32(weight)
+    matrix.sort_indices()
+    return matrix
+
+
+# Process-pool tasks: a chunk of raw catalog columns is cleaned and tokenized in the worker
+def _count_task(task):
+    chunk, weights = task
+    return count_soup(build_soup(chunk, weights))
+
+
+def _totals_task(task):
+    chunk, weights = task
+    _, terms, sums = count_soup(build_soup(chunk, weights))
+    return terms, sums
+
+
+def _featurize_task(task):
+    chunk, vocabulary, weights = task
+    return featurize(build_soup(chunk, weights), vocabulary)
+
+
+def map_chunks(fn, tasks, workers=None):
+    """Ordered map of `fn` over `tasks` on `workers` processes (default: all cores).
+
+    At most two tasks per worker are in flight, so `tasks` can be a lazy
+    stream of chunks that never sits in memory at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(fn, tasks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(fn, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def vectorize(df, weights=FIELD_WEIGHTS, workers=None):
+    """Fits the vocabulary and builds the weighted term-count matrix of `df`.
+
+    Chunks of rows are cleaned and tokenized in parallel, once each; the
+    chunk matrices are then re-indexed to the selected vocabulary.
+    Returns (float32 CSR matrix, vocabulary).
+    """
+    workers = workers or os.cpu_count() or 1
+    step = max(MIN_TASK_ROWS, min(DEFAULT_CHUNKSIZE, -(-len(df) // workers)))
+    columns = [field for field, weight in weights.items() if weight]
+    tasks = [(df[columns].iloc[i:i + step], weights) for i in range(0, len(df), step)]
+    parts = list(map_chunks(_count_task, tasks, min(workers, len(tasks)) or 1))
+
+    totals = {}
+    for _, terms, sums in parts:
+        add_totals(totals, terms, sums)
+    vocabulary = select_vocabulary(totals)
+
+    matrices = [to_vocabulary(counts, terms, vocabulary) for counts, terms, _ in parts]
+    if not matrices:
+        return sparse.csr_matrix((0, len(vocabulary)), dtype=np.float32), vocabulary
+    return sparse.vstack(matrices, format="csr"), vocabulary
+
+
+def engine_summary(engine, options):
+    """How the neighbor index was built, recorded in the artifact manifest."""
+    return {"neighbor_engine": {"engine": engine, **options}}
+
+
+def parse_weights(text):
+    """'cast=3,overview=0' -> FIELD_WEIGHTS with those fields changed."""
+    weights = dict(FIELD_WEIGHTS)
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        field, _, value = item.partition("=")
+        if field.strip() not in FIELD_WEIGHTS:
+            raise argparse.ArgumentTypeError(f"unknown field {field.strip()!r}, expected one of {list(FIELD_WEIGHTS)}")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight in {item!r}") from None
+        weights[field.strip()] = int(weight) if weight.is_integer() else weight
+    return weights
 
 # ------------------------------------------------------------------
-# 5. Save Model Data
+# 5. Build & Save Model Data
 # ------------------------------------------------------------------
-df["genres_list"] = df["genres"].apply(clean_genre_list)
-df["director_clean"] = df["director"].apply(clean_id)
-df["cast_list"] = df["cast"].apply(lambda x: [clean_id(n) for n in str(x).replace("|", ",").split(",")])
+def run(data_path=DATA_PATH, model_dir=MODEL_DIR, engine=DEFAULT_ENGINE, engine_options=None,
+        weights=FIELD_WEIGHTS, workers=None):
+    """In-memory build: the whole catalog is loaded at once.
+
+    `engine` picks the neighbor engine ("exact" or the approximate "ivf",
+    see utils/ann.py); `engine_options` are passed to it. The soup is
+    vectorized on `workers` processes (default: all cores).
+    """
+    engine_options = engine_options or {}
+    df = prepare(read_catalog(data_path))
+
+    print("Vectorizing data...")
+    vectors, vocabulary = vectorize(df, weights, workers)
+
+    # Only the top-K neighbors of each movie are kept (int32 ids + float32 scores),
+    # computed block by block so we never hold the dense N x N matrix.
+    print(f"Building neighbor index ({engine})...")
+    neighbors = build_neighbors(vectors, engine, **engine_options)
+
+    final_data = movie_metadata(df).reset_index(drop=True)
+
+    # Integer-coded languages, genres, directors and cast for vectorized scoring
+    catalog_index = build_catalog_index(final_data)
+
+    return artifact.save_model(model_dir, final_data, neighbors, catalog_index, vectors, vocabulary,
+                               extra={**engine_summary(engine, engine_options), "field_weights": weights})
+
+
+def run_streaming(data_path=DATA_PATH, model_dir=MODEL_DIR, chunksize=DEFAULT_CHUNKSIZE,
+                  engine=DEFAULT_ENGINE, engine_options=None, weights=FIELD_WEIGHTS, workers=None):
+    """Out-of-core build: the CSV is read twice in chunks and never held in memory.
+
+    Pass 1 counts terms to pick the vocabulary, pass 2 vectorizes each chunk
+    against it and appends the metadata to the artifact as it goes. Only the
+    sparse feature matrix and the per-row integer codes span the catalog.
+    Chunks are tokenized on `workers` processes (default: all cores).
+    """
+    engine_options = engine_options or {}
+    columns = [field for field, weight in weights.items() if weight]
+    print("Pass 1/2: counting terms...")
+    totals, sizes = {}, []
+
+    def count_tasks():
+        for chunk in read_catalog(data_path, chunksize):
+            sizes.append(len(chunk))
+            yield prepare(chunk)[columns], weights
+
+    for terms, sums in map_chunks(_totals_task, count_tasks(), workers):
+        add_totals(totals, terms, sums)
+    n_rows = sum(sizes)
+    vocabulary = select_vocabulary(totals)
+    del totals
+
+    staging = artifact.new_version_dir(model_dir)
+    try:
+        print("Pass 2/2: vectorizing data...")
+        builder = CatalogIndexBuilder()
+        popularity = []
+        with artifact.MoviesWriter(staging) as writer:
+            # Metadata is written here, in chunk order, while the workers tokenize
+            def featurize_tasks():
+                for chunk in read_catalog(data_path, chunksize):
+                    chunk = prepare(chunk)
+                    meta = movie_metadata(chunk)
+                    writer.write(meta)
+                    builder.add(meta)
+                    popularity.append(meta["vote_count"].to_numpy())
+                    yield chunk[columns], vocabulary, weights
+
+            parts = list(map_chunks(_featurize_task, featurize_tasks(), workers))
+        if writer.rows != n_rows:
+            raise RuntimeError(f"{data_path} changed while preprocessing ({n_rows} -> {writer.rows} rows)")
+
+        vectors = sparse.vstack(parts, format="csr") if parts else sparse.csr_matrix((0, len(vocabulary)))
+        del parts
+
+        print(f"Building neighbor index ({engine})...")
+        neighbors = artifact.open_neighbor_arrays(staging, n_rows, effective_k(n_rows))
+        build_neighbors(vectors, engine, out=neighbors, **engine_options)
+        neighbors.ids.flush()
+        neighbors.scores.flush()
+        del neighbors
+
+        artifact.write_index(staging, builder.build(), builder.titles)
+        popularity = np.concatenate(popularity) if popularity else np.zeros(0, dtype=np.int64)
+        artifact.write_resolver(staging, build_title_resolver(builder.titles, popularity))
+        artifact.write_features(staging, vectors, vocabulary)
+    except BaseException:
+        artifact.discard(staging)
+        raise
+    return artifact.publish(model_dir, staging, n_rows,
+                            extra={**engine_summary(engine, engine_options), "field_weights": weights})
+
+
+# ------------------------------------------------------------------
+# 6. Incremental Updates
+# ------------------------------------------------------------------
+def read_delta(path):
+    """Reads a delta CSV: catalog columns plus an optional `action` column.
+
+    action is "upsert" (default: add the title, or replace it if it already
+    exists) or "delete" (remove every movie with that title).
+    Returns (titles to delete, prepared upsert rows).
+    """
+    delta = pd.read_csv(path, encoding="latin-1", dtype={c: str for c in text_cols + ["action"]})
+    if "action" in delta:
+        actions = delta["action"].fillna("upsert").str.strip().str.lower()
+    else:
+        actions = pd.Series("upsert", index=delta.index)
+    unknown = set(actions) - {"upsert", "delete"}
+    if unknown:
+        raise ValueError(f"Unknown action(s) in {path}: {sorted(unknown)}")
+
+    deletes = set(delta.loc[actions == "delete", "title"].fillna("").astype(str))
+    upserts = delta.loc[actions == "upsert"].reindex(columns=cols)
+    upserts = prepare(upserts).drop_duplicates("title", keep="last").reset_index(drop=True)
+    return deletes, upserts
+
+
+def run_update(delta_path, model_dir=MODEL_DIR):
+    """Applies a delta CSV to the current artifact and publishes a new version.
+
+    Only the delta rows are vectorized (against the persisted vocabulary) and
+    only the neighbor lists they can affect are patched.
+    """
+    model = artifact.load_model(model_dir)
+    features, vocabulary = artifact.load_features(model.path)
+    base_manifest = artifact.read_manifest(model.path)
+    # Artifacts built before field weights were configurable used the defaults
+    weights = base_manifest.get("field_weights", FIELD_WEIGHTS)
+    old_movies = artifact.read_movies(model.path)  # every column, not just the compact in-memory ones
+    deletes, upserts = read_delta(delta_path)
+    n_old = len(old_movies)
+
+    titles = old_movies["title"].astype(str)
+    kept = np.flatnonzero(~titles.isin(deletes).to_numpy())
+    old_to_new = np.full(n_old, -1, dtype=np.int64)
+    old_to_new[kept] = np.arange(len(kept))
+
+    # Existing titles are replaced in place, everything else is appended.
+    src = kept.copy()
+    changed_old, appended = [], []
+    for i, title in enumerate(upserts["title"].astype(str)):
+        row = model.index.row_of(title)
+        if row is not None and old_to_new[row] >= 0:
+            src[old_to_new[row]] = n_old + i
+            changed_old.append(row)
+        else:
+            appended.append(i)
+    src = np.concatenate([src, n_old + np.array(appended, dtype=np.int64)])
+    touched = np.concatenate([old_to_new[changed_old], len(kept) + np.arange(len(appended))]).astype(np.int64)
+
+    print(f"Vectorizing {len(upserts)} changed movies...")
+    delta_vectors = featurize(build_soup(upserts, weights), vocabulary)
+    vectors = sparse.vstack([features, delta_vectors], format="csr")[src]
+
+    all_movies = pd.concat([old_movies, movie_metadata(upserts)], ignore_index=True)
+    movies = all_movies.iloc[src].reset_index(drop=True)
+
+    print("Patching neighbor index...")
+    stale = old_to_new.copy()
+    stale[changed_old] = -1  # their old similarity scores no longer hold
+    neighbors = patch_neighbor_index(model.neighbors, vectors, stale, touched)
+
+    catalog_index = build_catalog_index(movies)
+    summary = {
+        "parent": model.version,
+        "update": {"added": len(appended), "changed": len(changed_old), "deleted": int(n_old - len(kept))},
+        "field_weights": weights,
+    }
+    # How the base neighbor index was built (engine, nlist, nprobe) still describes the patched one
+    if "neighbor_engine" in base_manifest:
+        summary["neighbor_engine"] = base_manifest["neighbor_engine"]
+    return artifact.save_model(model_dir, movies, neighbors, catalog_index, vectors, vocabulary, extra=summary)
 
-final_data = df[[
-    "title", "poster_url", "original_language",
-    "vote_average", "vote_count","overview",
-    "genres_list", "director_clean", "cast_list"
-]]
 
-with open(r"C:\Users\sanke\OneDrive\Desktop\PythonProject\PythonProject\movie_recommendation_website\utils\movie_model.pkl", "wb") as f:
-    pickle.dump((final_data, cosine_sim), f)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the CineMatch model artifact.")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="Movie catalog CSV")
+    parser.add_argument("--out", type=Path, default=MODEL_DIR, help="Model artifact directory")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the CSV in chunks for catalogs that don't fit in RAM")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk in --stream mode")
+    parser.add_argument("--update", type=Path, metavar="DELTA_CSV",
+                        help="Apply new/changed/deleted titles to the current model instead of rebuilding")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help="Neighbor engine: exact (all pairs) or ivf (approximate, for ~1M titles)")
+    parser.add_argument("--nlist", type=int, default=None, help="ivf: number of clusters (default: 4 * sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE,
+                        help="ivf: clusters searched per movie; higher = better recall, slower build")
+    parser.add_argument("--weights", type=parse_weights, default=FIELD_WEIGHTS, metavar="FIELD=W,...",
+                        help=f"Soup field weights to change (default: {FIELD_WEIGHTS})")
+    parser.add_argument("--workers", type=int, default=None, help="Vectorizer processes (default: all cores)")
+    args = parser.parse_args()
 
-print("✅ Preprocessing Done! Model updated with Title matching.")
+    engine_options = {"nlist": args.nlist, "nprobe": args.nprobe} if args.engine == "ivf" else {}
+    if args.update:
+        manifest = run_update(args.update, args.out)
+    elif args.stream:
+        manifest = run_streaming(args.data, args.out, args.chunksize, args.engine, engine_options,
+                                 args.weights, args.workers)
+    else:
+        manifest = run(args.data, args.out, args.engine, engine_options, args.weights, args.workers)
+    print(f"Saved model version {manifest['version']} to {args.out}")
 
+    print("✅ Preprocessing Done! Model updated with Title matching.")
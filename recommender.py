@@ -1,46 +1,70 @@
 import pandas as pd
 import numpy as np
 
+from utils.leaderboards import explore
+from utils.result_cache import cache_key
 
-def recommend_movies(df, cosine_sim, title=None, target_languages=None, target_genres=None, top_n=10):
+# recommend_rows ranks the top_n * CANDIDATES_PER_RESULT - 1 nearest neighbors of the movie
+CANDIDATES_PER_RESULT = 5
+
+
+def recommend_movies(df, neighbors, index, title=None, target_languages=None, target_genres=None, top_n=10,
+                     cache=None, version=None):
+    """Recommended rows of `df` (an empty DataFrame when nothing matches).
+
+    With a ResultCache, ranked row ids are shared across sessions; `version`
+    (the model artifact version) keeps answers of different models apart.
+    """
+    def compute():
+        return recommend_rows(neighbors, index, title, target_languages, target_genres, top_n)
+
+    if cache is not None:
+        rows = cache.get_or_compute(cache_key(version, title, target_languages, target_genres, top_n), compute)
+    else:
+        rows = compute()
+
+    if len(rows):
+        return df.iloc[rows]
+    return pd.DataFrame()
+
+
+def candidate_window(neighbors, top_n):
+    """Neighbors read for `top_n` results; ValueError when `neighbors` stores fewer.
+
+    An index keeps K neighbors per movie (all of them in catalogs of K + 1
+    movies or fewer), so top_n is capped at (K + 1) // CANDIDATES_PER_RESULT,
+    20 with the default K of 100.
+    """
+    window = top_n * CANDIDATES_PER_RESULT - 1
+    if window > neighbors.k and neighbors.k < len(neighbors) - 1:
+        raise ValueError(f"top_n={top_n} needs {window} neighbors per movie but the index stores {neighbors.k}; "
+                         f"use top_n <= {(neighbors.k + 1) // CANDIDATES_PER_RESULT} or rebuild with a larger k")
+    return window
+
+
+def recommend_rows(neighbors, index, title=None, target_languages=None, target_genres=None, top_n=10):
+    """Ranked catalog rows for recommend_movies.
+
+    With a title, top_n may not exceed what the neighbor index covers (see
+    candidate_window); exploration mode has no such limit.
+    """
     # ---------------------------------------------------------
     # SCENARIO 1: EXPLORATION MODE (No Movie Selected)
     # ---------------------------------------------------------
     if not title:
-        filtered_df = df.copy()
-        if target_languages:
-            filtered_df = filtered_df[filtered_df["original_language"].isin(target_languages)]
-
-        if target_genres:
-            def has_genre(movie_genres):
-                return not set(movie_genres).isdisjoint(set(target_genres))
-
-            filtered_df = filtered_df[filtered_df["genres_list"].apply(has_genre)]
-
-        if not filtered_df.empty:
-            m = filtered_df["vote_count"].quantile(0.70)
-            q_movies = filtered_df[filtered_df["vote_count"] >= m].copy()
-            if q_movies.empty: q_movies = filtered_df.copy()
-            q_movies = q_movies.sort_values("vote_average", ascending=False)
-            return q_movies.head(top_n)
-        return pd.DataFrame()
+        # Precomputed leaderboards cover the common filters; the rest is ranked live
+        return explore(index, target_languages, target_genres, top_n)
 
     # ---------------------------------------------------------
     # SCENARIO 2: RECOMMENDATION MODE (Movie Selected)
     # ---------------------------------------------------------
-    if title not in df["title"].values:
-        return pd.DataFrame()
+    idx = index.row_of(title)
+    if idx is None:
+        return np.zeros(0, dtype=np.int32)
 
     # Get Source Movie Details
-    idx = df[df["title"] == title].index[0]
-
-    # Validation: Ensure index is valid
-    if isinstance(idx, pd.Index): idx = idx[0]
-
-    source_genres = set(df.loc[idx, "genres_list"])
-    source_cast = set(df.loc[idx, "cast_list"])
-    source_director = df.loc[idx, "director_clean"]
-    source_lang = df.loc[idx, "original_language"]
+    source_director = index.director_codes[idx]
+    source_lang = index.languages[index.lang_codes[idx]]
 
     # Language Logic: If no preference, stick to source language
     if not target_languages:
@@ -48,46 +72,134 @@ def recommend_movies(df, cosine_sim, title=None, target_languages=None, target_g
     else:
         allowed_langs = target_languages
 
-    # Get Candidates
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[1:top_n * 5]  # Look at top candidates
-
-    candidates = []
-
-    for i, sim in sim_scores:
-        row = df.iloc[i]
+    # Get Candidates (neighbor lists are pre-sorted and never contain the movie itself)
+    cand_ids, cand_scores = neighbors.neighbors(idx, candidate_window(neighbors, top_n))  # Look at top candidates
 
-        # 1. Language Filter
-        if row["original_language"] not in allowed_langs:
-            continue
-
-        row_genres = set(row["genres_list"])
-
-        # 2. Genre Filter (Only if user selected specific genres in sidebar)
-        if target_genres:
-            if not row_genres.intersection(set(target_genres)):
-                continue
+    # 1. Language Filter
+    keep = np.isin(index.lang_codes[cand_ids], index.language_codes_for(allowed_langs))
 
-        # 🟢 REMOVED BAD "COMEDY" LOGIC HERE
-        # We now rely purely on the improved 'soup' similarity
+    # 2. Genre Filter (Only if user selected specific genres in sidebar)
+    if target_genres:
+        keep &= (index.genre_masks[cand_ids] & index.genre_mask_for(target_genres)) != 0
 
-        # 3. Scoring Boosts
-        score = sim
+    # 🟢 REMOVED BAD "COMEDY" LOGIC HERE
+    # We now rely purely on the improved 'soup' similarity
 
-        # Director Boost
-        if row["director_clean"] == source_director and source_director:
-            score += 0.10
+    cand_ids = cand_ids[keep]
+    scores = cand_scores[keep].astype(np.float64)
 
-        # Cast Boost
-        target_cast = set(row["cast_list"])
-        shared_actors = source_cast.intersection(target_cast)
-        if len(shared_actors) > 0:
-            score += 0.10
+    # 3. Scoring Boosts
+    # Director Boost
+    if source_director >= 0:
+        scores += 0.10 * (index.director_codes[cand_ids] == source_director)
 
-        candidates.append((i, score))
+    # Cast Boost
+    scores += 0.10 * index.shares_cast(idx, cand_ids)
 
     # Sort final candidates by score
-    candidates = sorted(candidates, key=lambda x: x[1], reverse=True)
-    top_indices = [x[0] for x in candidates[:top_n]]
-
-    return df.iloc[top_indices]
\ No newline at end of file
+    return cand_ids[_top_positions(scores, top_n)]
+
+
+def recommend_rows_batch(neighbors, index, queries):
+    """recommend_rows for many (title, target_languages, target_genres, top_n) queries at once.
+
+    Recommendation-mode queries share one gather/mask/boost/sort pass over a
+    (queries x candidates) matrix; exploration queries are served one by one
+    from the leaderboards. Results match recommend_rows exactly, and so do
+    the errors (a top_n beyond the neighbor window raises ValueError).
+    """
+    results = [None] * len(queries)
+    batch = []
+    for pos, (title, languages, genres, top_n) in enumerate(queries):
+        if not title:
+            results[pos] = explore(index, languages, genres, top_n)
+            continue
+        idx = index.row_of(title)
+        if idx is None or top_n <= 0:
+            results[pos] = np.zeros(0, dtype=np.int32)
+        else:
+            candidate_window(neighbors, top_n)
+            batch.append((pos, idx, languages, genres, top_n))
+    if not batch:
+        return results
+
+    positions = [b[0] for b in batch]
+    src = np.array([b[1] for b in batch], dtype=np.int64)
+    top_ns = np.array([b[4] for b in batch], dtype=np.int64)
+    windows = top_ns * CANDIDATES_PER_RESULT - 1
+    width = min(int(windows.max()), neighbors.k)
+
+    # Candidates of every query side by side; columns past a query's window are padding
+    cand_ids = np.asarray(neighbors.ids[src, :width])
+    scores = np.asarray(neighbors.scores[src, :width]).astype(np.float64)
+    keep = (cand_ids >= 0) & (np.arange(width) < windows[:, None])
+    safe_ids = np.where(keep, cand_ids, 0)
+
+    # 1. Language Filter: one row of allowed language codes per query
+    allowed = np.zeros((len(batch), len(index.languages)), dtype=bool)
+    genre_masks = np.zeros(len(batch), dtype=np.uint64)
+    filtered = np.zeros(len(batch), dtype=bool)
+    for q, (_, idx, languages, genres, _) in enumerate(batch):
+        if not languages:
+            source_lang = index.languages[index.lang_codes[idx]]
+            languages = [source_lang, "en"] if source_lang != "en" else ["en"]
+        allowed[q, index.language_codes_for(languages)] = True
+        if genres:
+            filtered[q] = True
+            genre_masks[q] = index.genre_mask_for(genres)  # 0 when no genre is known: nothing passes
+    keep &= allowed[np.arange(len(batch))[:, None], index.lang_codes[safe_ids]]
+
+    # 2. Genre Filter (only for queries with genres, like recommend_rows)
+    keep[filtered] &= (index.genre_masks[safe_ids[filtered]] & genre_masks[filtered, None]) != 0
+
+    # 3. Scoring Boosts
+    source_directors = index.director_codes[src]
+    scores += 0.10 * ((index.director_codes[safe_ids] == source_directors[:, None])
+                      & (source_directors[:, None] >= 0))
+    scores += 0.10 * _shares_cast_batch(index, src, safe_ids)
+
+    # Sort: best score first, ties in candidate order (like recommend_rows)
+    scores[~keep] = -np.inf
+    order = np.lexsort((np.broadcast_to(np.arange(width), scores.shape), -scores))
+    for q, pos in enumerate(positions):
+        ranked = order[q]
+        ranked = ranked[keep[q, ranked]][:top_ns[q]]
+        results[pos] = cand_ids[q, ranked]
+    return results
+
+
+def _shares_cast_batch(index, src, cand_ids):
+    """(queries x candidates) boolean: does each candidate share cast with its query's movie?"""
+    offsets = index.cast_offsets
+    n_cast = np.int64(len(index.cast) + 1)
+
+    # Keys query * n_cast + cast for every cast entry of every source movie
+    src_lengths = offsets[src + 1] - offsets[src]
+    src_owner = np.repeat(np.arange(len(src)), src_lengths)
+    src_flat = np.repeat(offsets[src] - np.cumsum(src_lengths) + src_lengths, src_lengths) + np.arange(src_lengths.sum())
+    src_keys = src_owner * n_cast + index.cast_values[src_flat]
+
+    flat_ids = cand_ids.ravel()
+    starts = offsets[flat_ids]
+    lengths = offsets[flat_ids + 1] - starts
+    if not len(src_keys) or not lengths.sum():
+        return np.zeros(cand_ids.shape, dtype=bool)
+    owner = np.repeat(np.arange(len(flat_ids)), lengths)
+    flat = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    keys = (owner // cand_ids.shape[1]) * n_cast + index.cast_values[flat]
+    hits = np.isin(keys, src_keys)
+    return (np.bincount(owner[hits], minlength=len(flat_ids)) > 0).reshape(cand_ids.shape)
+
+
+def _top_positions(scores, n):
+    """Positions of the `n` best scores, ties kept in candidate order (like a stable sort)."""
+    if n <= 0:
+        return np.arange(0)
+    if len(scores) > n:
+        # Keep everything tied with the n-th best so the stable order below decides.
+        kth = -np.partition(-scores, n - 1)[n - 1]
+        part = np.flatnonzero(scores >= kth)
+    else:
+        part = np.arange(len(scores))
+    order = np.lexsort((part, -scores[part]))
+    return part[order][:n]
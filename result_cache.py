@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def cache_key(version, title, languages, genres, top_n):
+    """Key for one recommend_movies call; filter order does not matter."""
+    return (
+        version,
+        title or None,
+        tuple(sorted(set(languages or ()))),
+        tuple(sorted(set(genres or ()))),
+        int(top_n),
+    )
+
+
+class ResultCache:
+    """Bounded, thread-safe LRU cache of ranked row ids shared by every session.
+
+    Keys start with the model artifact version; the first lookup for a new
+    version drops everything cached for the old one.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Cached rows for `key`, computing (outside the lock) and storing them on a miss."""
+        with self._lock:
+            if key[0] != self._version:
+                self._entries.clear()
+                self._version = key[0]
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rows
+            self.misses += 1
+
+        rows = compute().copy()
+        rows.flags.writeable = False
+        with self._lock:
+            if key[0] == self._version:
+                self._entries[key] = rows
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return rows
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "version": self._version,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,204 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from utils.artifact import load_model
+from utils.microbatch import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT, MicroBatcher
+from utils.neighbors import DEFAULT_TOP_K
+from utils.recommender import CANDIDATES_PER_RESULT, recommend_rows_batch
+from utils.result_cache import ResultCache, cache_key
+
+# ------------------------------------------------------------------
+# Headless recommendation service
+# ------------------------------------------------------------------
+# Loads the model artifact once and answers JSON over HTTP, independent of
+# Streamlit. Stateless apart from caches, so any number of copies can run
+# behind a load balancer.
+#
+#   python service.py --port 8000
+#
+#   GET /similar?title=Inception&languages=en,hi&genres=action&top_n=10
+#   GET /explore?languages=en&genres=drama&top_n=12
+#   GET /resolve?q=the dark knigth&limit=5
+#   GET /healthz
+#
+# Concurrent /similar and /explore requests are coalesced by a MicroBatcher
+# and scored together with recommend_rows_batch.
+
+BASE_DIR = Path(__file__).resolve().parent
+MODEL_DIR = BASE_DIR / "utils" / "movie_model"
+
+# recommend_rows ranks top_n * 5 - 1 stored neighbors, so larger top_n would get a truncated window
+MAX_TOP_N = DEFAULT_TOP_K // CANDIDATES_PER_RESULT
+MOVIE_FIELDS = ["title", "poster_url", "original_language", "vote_average", "vote_count", "director_clean"]
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _json_value(value):
+    if isinstance(value, (float, np.floating)):
+        # Ratings are float32: 7.2, not 7.199999809265137
+        return None if value != value else float(f"{value:.7g}")
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+class RecommendationService:
+    """Model, caches and micro-batcher shared by every request thread."""
+
+    def __init__(self, model_dir=MODEL_DIR, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+        self.model = load_model(model_dir)
+        self.cache = ResultCache()
+        self.batcher = MicroBatcher(self._score, max_batch, max_wait)
+        self._records = self.model.movies[MOVIE_FIELDS]
+
+    def _score(self, queries):
+        return recommend_rows_batch(self.model.neighbors, self.model.index, queries)
+
+    def rows(self, title, languages, genres, top_n):
+        key = cache_key(self.model.version, title, languages, genres, top_n)
+        return self.cache.get_or_compute(key, lambda: self.batcher.submit((title, languages, genres, top_n)))
+
+    def movies(self, rows):
+        records = self._records.iloc[rows].to_dict("records")
+        return [
+            {"row": int(row), **{k: _json_value(v) for k, v in record.items()},
+             "overview": self.model.overviews[row], "genres_list": self.model.index.genres_of(row)}
+            for row, record in zip(rows, records)
+        ]
+
+    def similar(self, params):
+        title = _param(params, "title")
+        if not title:
+            raise BadRequest("missing 'title'")
+        filters = _filters(params)
+        if self.model.index.row_of(title) is None:
+            return {"title": title, "found": False, "results": []}
+        rows = self.rows(title, *filters)
+        return {"title": title, "found": True, "results": self.movies(rows)}
+
+    def explore(self, params):
+        return {"results": self.movies(self.rows(None, *_filters(params)))}
+
+    def resolve(self, params):
+        query = _param(params, "q")
+        if not query:
+            raise BadRequest("missing 'q'")
+        limit = _int_param(params, "limit", 5)
+        titles = self.model.movies["title"]
+        matches = self.model.resolver.resolve(query, limit=limit)
+        return {"q": query, "results": [{"row": row, "title": titles.iat[row], "score": score}
+                                        for row, score in matches]}
+
+    def health(self, params):
+        return {
+            "status": "ok",
+            "version": self.model.version,
+            "movies": len(self.model.index),
+            "cache": self.cache.stats(),
+            "batching": self.batcher.stats(),
+        }
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1].strip() if values else default
+
+
+def _int_param(params, name, default):
+    value = _param(params, name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if not 1 <= value <= MAX_TOP_N:
+        raise BadRequest(f"'{name}' must be between 1 and {MAX_TOP_N}")
+    return value
+
+
+def _list_param(params, name):
+    return [v.strip() for value in params.get(name, []) for v in value.split(",") if v.strip()]
+
+
+def _filters(params):
+    languages = _list_param(params, "languages")
+    genres = [g.lower() for g in _list_param(params, "genres")]
+    return languages, genres, _int_param(params, "top_n", 10)
+
+
+def make_handler(service):
+    routes = {
+        "/similar": service.similar,
+        "/explore": service.explore,
+        "/resolve": service.resolve,
+        "/healthz": service.health,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            route = routes.get(url.path)
+            if route is None:
+                return self._send(404, {"error": f"unknown path {url.path}"})
+            try:
+                self._send(200, route(parse_qs(url.query)))
+            except BadRequest as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                self.log_error("%s failed: %r", url.path, e)
+                self._send(500, {"error": "internal error"})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if self.server.verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8000, model_dir=MODEL_DIR, verbose=False, **batch_options):
+    service = RecommendationService(model_dir, **batch_options)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    server.verbose = verbose
+    print(f"Serving model {service.model.version} ({len(service.model.index)} movies) on http://{host}:{port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", type=Path, default=MODEL_DIR, help="Model artifact directory")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Requests per scoring batch")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000,
+                        help="How long a request waits for others to batch with")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.model, args.verbose,
+                   max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,41 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteStore:
+    """SQLite database behind TMDBCache and JarvisCache.
+
+    Safe to share between threads, Streamlit sessions and server processes:
+    every thread gets its own connection and the database runs in WAL mode.
+    evict() applies TTL and LRU limits to an `entries` table with `expires_at`
+    and `last_access` columns.
+    """
+
+    def __init__(self, path, max_entries, timeout=5):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def conn(self):
+        """This thread's connection (autocommit; use `with conn:` for transactions)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def evict(self, conn, now):
+        """Deletes expired entries, then the least recently used ones past `max_entries`; returns the count."""
+        removed = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            removed += conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        return removed
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Shape of movie_db_READY_FOR_RECOMMENDER.csv
+COLUMNS = ["title", "overview", "genres", "keywords", "cast", "director",
+           "vote_average", "vote_count", "original_language", "poster_url"]
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+          "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction",
+          "TV Movie", "Thriller", "War", "Western"]
+LANGUAGES = ["en", "hi", "fr", "es", "ja", "ko", "ta", "te", "ml", "de", "it", "zh"]
+LANGUAGE_WEIGHTS = [0.55, 0.15, 0.05, 0.05, 0.04, 0.04, 0.03, 0.03, 0.02, 0.02, 0.01, 0.01]
+
+_SYLLABLES = ["ka", "ra", "mi", "to", "shi", "an", "el", "or", "vin", "dra", "lu", "ne",
+              "sa", "ber", "ton", "mar", "li", "jo", "de", "po", "rex", "qui", "zu", "fa"]
+
+
+def _words(rng, n, syllables=(2, 4)):
+    lengths = rng.integers(syllables[0], syllables[1] + 1, n)
+    parts = rng.integers(0, len(_SYLLABLES), lengths.sum())
+    words, pos = [], 0
+    for length in lengths:
+        words.append("".join(_SYLLABLES[p] for p in parts[pos:pos + length]))
+        pos += length
+    return words
+
+
+def _zipf_choice(rng, size, n, a=1.2):
+    """Indices into a vocabulary of `n`, a few very common and a long tail (like real names/terms)."""
+    return (rng.zipf(a, size) - 1) % n
+
+
+def _joined(vocab, idx, counts, sep):
+    out, pos = [], 0
+    for count in counts:
+        out.append(sep.join(vocab[i] for i in idx[pos:pos + count]))
+        pos += count
+    return out
+
+
+def generate_catalog(n_rows, seed=0):
+    """Synthetic catalog with the columns and value formats of the real CSV.
+
+    Vocabulary sizes grow with the catalog and names, keywords and overview
+    words follow a Zipf-like distribution, so vectorizing and neighbor
+    search do realistic amounts of work.
+    """
+    rng = np.random.default_rng(seed)
+    scale = max(n_rows, 1000)
+    words = _words(rng, 20_000)
+    people = [f"{first.title()} {last.title()}"
+              for first, last in zip(_words(rng, scale // 2), _words(rng, scale // 2))]
+    directors = people[: max(len(people) // 8, 1)]
+
+    title_words = rng.integers(1, 4, n_rows)
+    titles = _joined([w.title() for w in words], _zipf_choice(rng, title_words.sum(), len(words), 1.05),
+                     title_words, " ")
+    # A few remakes / re-releases share a title, as in the real catalog
+    dupes = rng.random(n_rows) < 0.01
+    titles = [titles[rng.integers(0, n_rows)] if d else t for t, d in zip(titles, dupes)]
+
+    overview_words = rng.integers(15, 60, n_rows)
+    keyword_counts = rng.integers(0, 8, n_rows)
+    cast_counts = rng.integers(0, 6, n_rows)
+    genre_counts = rng.integers(1, 4, n_rows)
+
+    genres = []
+    for count in genre_counts:
+        genres.append(", ".join(rng.choice(GENRES, count, replace=False)))
+
+    has_director = rng.random(n_rows) > 0.05
+    director_idx = _zipf_choice(rng, n_rows, len(directors), 1.3)
+
+    df = pd.DataFrame({
+        "title": titles,
+        "overview": _joined(words, _zipf_choice(rng, overview_words.sum(), len(words), 1.1), overview_words, " "),
+        "genres": genres,
+        "keywords": _joined(words, _zipf_choice(rng, keyword_counts.sum(), len(words)), keyword_counts, ", "),
+        "cast": _joined(people, _zipf_choice(rng, cast_counts.sum(), len(people), 1.3), cast_counts, ", "),
+        "director": [directors[i] if d else "" for i, d in zip(director_idx, has_director)],
+        "vote_average": np.round(np.clip(rng.normal(6.2, 1.2, n_rows), 0, 10), 1),
+        "vote_count": np.minimum(rng.pareto(1.2, n_rows) * 20, 40_000).astype(np.int64),
+        "original_language": rng.choice(LANGUAGES, n_rows, p=LANGUAGE_WEIGHTS),
+        "poster_url": [f"https://image.tmdb.org/t/p/w500/synthetic{i}.jpg" for i in range(n_rows)],
+    })
+    return df[COLUMNS]
+
+
+def write_catalog(path, n_rows, seed=0):
+    """Writes a synthetic catalog CSV (latin-1, like the real one) and returns its path."""
+    df = generate_catalog(n_rows, seed)
+    df.to_csv(path, index=False, encoding="latin-1")
+    return path
@@ -0,0 +1,11 @@
+import sys
+import types
+from pathlib import Path
+
+# The modules import each other as utils.<name> (this checkout is the app's
+# utils/ package), so expose the repository root under that name.
+ROOT = Path(__file__).resolve().parents[1]
+if "utils" not in sys.modules:
+    utils = types.ModuleType("utils")
+    utils.__path__ = [str(ROOT)]
+    sys.modules["utils"] = utils
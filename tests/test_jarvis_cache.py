@@ -0,0 +1,43 @@
+import pytest
+
+from utils.jarvis_cache import JarvisCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return JarvisCache(tmp_path / "jarvis.sqlite")
+
+
+def test_rephrased_prompt_hits(cache):
+    cache.put("best horror movies", {"answer": 1})
+    assert cache.get("What are the best HORROR movies?") == {"answer": 1}
+    assert cache.stats()["near_hits"] == 1
+
+
+@pytest.mark.parametrize("cached, prompt", [
+    ("movies with gore", "movies without gore"),
+    ("films after 2000", "films before 2000"),
+    ("top 10 thrillers", "top 5 thrillers"),
+    ("romantic comedies not from hollywood", "romantic comedies from hollywood"),
+    ("best 10 horror movies from korea and japan", "best 5 horror movies from korea and japan"),
+    ("best marathi movies", "best marathi comedy movies"),
+    ("best marathi movies", "best marathi romance movies"),
+    ("best marathi comedy movies", "best marathi movies"),
+    ("horror movies from korea and japan", "horror movies from korea"),
+])
+def test_qualifiers_must_agree(cache, cached, prompt):
+    cache.put(cached, {"answer": cached})
+    assert cache.get(prompt) is None
+    assert cache.get(cached) == {"answer": cached}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = JarvisCache(tmp_path / "jarvis.sqlite", max_entries=2)
+    cache.put("korean thrillers", {"answer": 1})
+    cache.put("french comedies", {"answer": 2})
+    cache.put("tamil dramas", {"answer": 3})
+    assert cache.get("korean thrillers") is None
+    assert cache.get("french comedies") == {"answer": 2}
+    assert cache.stats()["entries"] == 2
+    terms = cache._store.conn().execute("SELECT DISTINCT key FROM terms").fetchall()
+    assert sorted(terms) == [("french comedies",), ("tamil dramas",)]
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from utils.jarvis_stream import FakeGroqClient, parse_jarvis_stream
+
+ANSWER = {
+    "response_text": 'Here are "three" picks \\ with café vibes\nand a new line.',
+    "recommendations": [
+        {"title": "Amélie", "overview": "A shy waitress {secretly} helps others."},
+        {"title": "Don 2", "overview": 'Don returns, "bigger" than ever.'},
+        {"title": "Lagaan", "overview": "Cricket, [taxes] and a village."},
+    ],
+}
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def stream(pieces):
+    """Events of parse_jarvis_stream with consecutive text deltas joined, plus the final answer."""
+    events, done = [], []
+    for event, value in parse_jarvis_stream(pieces):
+        if event == "done":
+            done.append(value)
+        elif event == "text" and events and events[-1][0] == "text":
+            events[-1] = ("text", events[-1][1] + value)
+        else:
+            events.append((event, value))
+    assert len(done) == 1
+    return events, done[0]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_chunk_sizes_give_the_same_events(size):
+    raw = json.dumps(ANSWER, ensure_ascii=False)
+    events, answer = stream(chunks(raw, size))
+    assert events == [("text", ANSWER["response_text"])] + [("recommendation", item) for item in ANSWER["recommendations"]]
+    assert answer == ANSWER
+
+
+def test_ascii_escapes_are_decoded():
+    raw = json.dumps(ANSWER)  # é, \" and \\ split across 1-character chunks
+    events, answer = stream(chunks(raw, 1))
+    assert events[0] == ("text", ANSWER["response_text"])
+    assert answer == ANSWER
+
+
+def test_text_deltas_never_contain_partial_escapes():
+    deltas = [value for event, value in parse_jarvis_stream(chunks(json.dumps(ANSWER), 1)) if event == "text"]
+    assert not any("\\u" in delta or delta.endswith("\\\\") for delta in deltas)
+    assert "".join(deltas) == ANSWER["response_text"]
+
+
+def test_recommendations_first_then_text():
+    answer = {"recommendations": ANSWER["recommendations"][:1], "response_text": "Only one."}
+    events, done = stream(chunks(json.dumps(answer), 1))
+    assert events == [("recommendation", answer["recommendations"][0]), ("text", "Only one.")]
+    assert done == answer
+
+
+def test_fenced_json():
+    raw = "```json\n" + json.dumps(ANSWER, indent=2) + "\n```"
+    events, answer = stream(chunks(raw, 5))
+    assert [event for event, _ in events] == ["text", "recommendation", "recommendation", "recommendation"]
+    assert answer == ANSWER
+
+
+def test_truncated_stream_keeps_what_completed():
+    raw = json.dumps(ANSWER)
+    cut = raw.index('"Lagaan"')
+    events, answer = stream(chunks(raw[:cut], 4))
+    assert events == [("text", ANSWER["response_text"])] + [("recommendation", item) for item in ANSWER["recommendations"][:2]]
+    assert answer == {"response_text": ANSWER["response_text"], "recommendations": ANSWER["recommendations"][:2]}
+
+
+def test_truncated_inside_text():
+    raw = json.dumps(ANSWER)
+    cut = raw.index("vibes")
+    events, answer = stream(chunks(raw[:cut], 1))
+    assert events == [("text", ANSWER["response_text"][:ANSWER["response_text"].index("vibes")])]
+    assert answer == {"response_text": events[0][1], "recommendations": []}
+
+
+def test_fake_groq_client_streams_through_the_parser():
+    client = FakeGroqClient(ANSWER, chunk_size=3, delay=0)
+    completion = client.chat.completions.create(model="fake", messages=[], stream=True)
+    events, answer = stream(chunk.choices[0].delta.content for chunk in completion)
+    assert answer == ANSWER
+    assert len(events) == 4
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+
+from utils.catalog_index import build_catalog_index
+from utils.neighbors import build_neighbor_index, patch_neighbor_index
+from utils.preprocess import build_soup, featurize, movie_metadata, prepare, vectorize
+from utils.recommender import recommend_rows, recommend_rows_batch
+from utils.synthetic_catalog import generate_catalog
+
+N_ROWS = 3000
+LANGUAGE_FILTERS = [None, ["en"], ["hi", "ta"], ["fr", "en", "ja"]]
+GENRE_FILTERS = [None, ["drama"], ["comedy", "horror"], ["science fiction", "family", "war"]]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    df = prepare(generate_catalog(N_ROWS, seed=7))
+    vectors, vocabulary = vectorize(df, workers=1)
+    movies = movie_metadata(df).reset_index(drop=True)
+    return movies, vectors, vocabulary, build_neighbor_index(vectors), build_catalog_index(movies)
+
+
+def original_candidates(movies, vectors, title, target_languages, target_genres, window):
+    """(row, score) of the `window` most similar movies that pass the filters, scored by the
+    recommend_movies loop that predates the neighbor index."""
+    idx = movies.index[movies["title"] == title][0]
+    source_cast = set(movies.at[idx, "cast_list"])
+    source_director = movies.at[idx, "director_clean"]
+    source_lang = movies.at[idx, "original_language"]
+    if not target_languages:
+        allowed_langs = [source_lang, "en"] if source_lang != "en" else ["en"]
+    else:
+        allowed_langs = target_languages
+
+    sim_scores = list(enumerate(cosine_similarity(vectors[idx], vectors)[0]))
+    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[1:window + 1]
+
+    candidates = []
+    for i, sim in sim_scores:
+        row = movies.iloc[i]
+        if row["original_language"] not in allowed_langs:
+            continue
+        if target_genres and not set(row["genres_list"]).intersection(set(target_genres)):
+            continue
+        score = sim
+        if row["director_clean"] == source_director and source_director:
+            score += 0.10
+        if source_cast.intersection(set(row["cast_list"])):
+            score += 0.10
+        candidates.append((i, score))
+    return candidates
+
+
+def queries(movies, n_titles=25, seed=3):
+    unique = movies["title"].drop_duplicates(keep=False)
+    titles = np.random.default_rng(seed).choice(unique.to_numpy(), n_titles, replace=False)
+    for i, title in enumerate(titles):
+        yield (title, LANGUAGE_FILTERS[i % len(LANGUAGE_FILTERS)],
+               GENRE_FILTERS[i // len(LANGUAGE_FILTERS) % len(GENRE_FILTERS)], (5, 12, 20)[i % 3])
+
+
+def test_recommend_rows_matches_the_original_loop(catalog):
+    movies, vectors, _, neighbors, index = catalog
+    for title, languages, genres, top_n in queries(movies):
+        candidates = original_candidates(movies, vectors, title, languages, genres, top_n * 5 - 1)
+        expected = sorted(candidates, key=lambda x: x[1], reverse=True)[:top_n]
+        rows = recommend_rows(neighbors, index, title, languages, genres, top_n)
+        scores = dict(original_candidates(movies, vectors, title, languages, genres, top_n * 10))
+
+        # Same scores in the same order; rows may only differ among (float32) ties
+        assert len(rows) == len(expected), title
+        np.testing.assert_allclose([scores[r] for r in rows], [s for _, s in expected], atol=1e-5)
+        expected_scores = np.array([s for _, s in expected])
+        for pos, (row, score) in enumerate(expected):
+            if np.sum(np.abs(expected_scores - score) < 1e-5) == 1:
+                assert rows[pos] == row, (title, pos)
+
+
+def test_unknown_title_and_filters_give_nothing(catalog):
+    movies, _, _, neighbors, index = catalog
+    title = movies["title"].iat[0]
+    assert len(recommend_rows(neighbors, index, "No Such Movie")) == 0
+    assert len(recommend_rows(neighbors, index, title, target_genres=["no-such-genre"])) == 0
+    assert len(recommend_rows(neighbors, index, title, target_languages=["xx"])) == 0
+
+
+def test_batch_matches_single_queries(catalog):
+    movies, _, _, neighbors, index = catalog
+    batch = list(queries(movies, n_titles=40, seed=5))
+    title = batch[0][0]
+    batch += [
+        (title, None, ["no-such-genre"], 10),
+        (title, None, ["dramaa", "drama"], 10),
+        (title, ["xx"], None, 10),
+        (title, ["xx", "en"], ["comedy"], 10),
+        ("No Such Movie", None, None, 10),
+        (None, ["en"], ["drama"], 12),
+        (None, None, ["no-such-genre"], 12),
+        (None, ["xx"], None, 12),
+        (title, None, None, 0),
+    ]
+    for query, rows in zip(batch, recommend_rows_batch(neighbors, index, batch)):
+        np.testing.assert_array_equal(rows, recommend_rows(neighbors, index, *query), err_msg=str(query))
+
+
+def test_top_n_is_limited_to_the_neighbor_window(catalog):
+    movies, _, _, neighbors, index = catalog
+    title = movies["title"].iat[0]
+    assert len(recommend_rows(neighbors, index, title, ["en", "hi", "fr"], top_n=20)) == 20
+    with pytest.raises(ValueError):
+        recommend_rows(neighbors, index, title, top_n=21)
+    with pytest.raises(ValueError):
+        recommend_rows_batch(neighbors, index, [(title, None, None, 10), (title, None, None, 21)])
+
+
+def test_patched_index_equals_a_rebuild(catalog):
+    _, vectors, vocabulary, neighbors, _ = catalog
+    rng = np.random.default_rng(11)
+    n_old = vectors.shape[0]
+    other = featurize(build_soup(prepare(generate_catalog(60, seed=8))), vocabulary)
+
+    deleted = rng.choice(n_old, 30, replace=False)
+    kept = np.setdiff1d(np.arange(n_old), deleted)
+    changed = rng.choice(len(kept), 20, replace=False)  # new rows whose vectors change
+
+    new_vectors = sparse.lil_matrix(vectors[kept])
+    new_vectors[changed] = other[:20]
+    new_vectors = sparse.vstack([new_vectors.tocsr(), other[20:]], format="csr")
+
+    old_to_new = np.full(n_old, -1, dtype=np.int64)
+    old_to_new[kept] = np.arange(len(kept))
+    old_to_new[kept[changed]] = -1
+    touched = np.concatenate([changed, len(kept) + np.arange(other.shape[0] - 20)])
+
+    patched = patch_neighbor_index(neighbors, new_vectors, old_to_new, touched)
+    rebuilt = build_neighbor_index(new_vectors)
+    np.testing.assert_array_equal(patched.ids, rebuilt.ids)
+    np.testing.assert_allclose(patched.scores, rebuilt.scores, atol=1e-6)
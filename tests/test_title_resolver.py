@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.title_resolver import build_title_resolver
+
+TITLES = ["Toy Story", "Don", "Iron Man", "Iron Man 2", "The Dark Knight", "Amélie"]
+VOTES = [100, 50, 80, 40, 90, 10]
+
+
+def resolve(query):
+    match = build_title_resolver(TITLES, VOTES).resolve_many([query])[0]
+    return TITLES[match[0]] if match else None
+
+
+def test_exact_and_typo_matches():
+    assert resolve("amelie (2001)") == "Amélie"
+    assert resolve("Iron Man 2") == "Iron Man 2"
+    assert resolve("The Dark Knigth") == "The Dark Knight"
+
+
+def test_sequels_and_near_misses_fall_through():
+    for query in ["Toy Story 3", "Don 2", "Iron Man 3", "Iron Mask"]:
+        assert resolve(query) is None, query
+
+
+def test_build_does_not_depend_on_hash_seed():
+    script = ("import sys, types; u = types.ModuleType('utils'); u.__path__ = [sys.argv[1]]; sys.modules['utils'] = u\n"
+              "from utils.title_resolver import build_title_resolver\n"
+              f"r = build_title_resolver({TITLES!r}, {VOTES!r})\n"
+              "print(r.grams, r.gram_rows.tolist(), r.gram_offsets.tolist())")
+    root = str(Path(__file__).resolve().parents[1])
+    outputs = {subprocess.run([sys.executable, "-c", script, root], capture_output=True, text=True, check=True,
+                              env={**os.environ, "PYTHONHASHSEED": seed}).stdout for seed in ("1", "2", "3")}
+    assert len(outputs) == 1
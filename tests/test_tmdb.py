@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from utils.tmdb import PLACEHOLDER_POSTER, TMDBClient
+from utils.tmdb_cache import MISSING, TMDBCache
+
+OVERVIEW = "A thief who steals corporate secrets through dream-sharing technology."
+
+
+class StubTMDB(BaseHTTPRequestHandler):
+    """Local stand-in for the TMDB API, driven by the searched title.
+
+    "Delay <x>" answers after 0.4s, "Slow" after 3s, "Nothing" finds no
+    movie and "Broken" fails with a 500; anything else is found.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query).get("query", [""])[0]
+        self.server.requests[(url.path, query)] += 1
+
+        if url.path.endswith("/videos"):
+            return self._send(200, {"results": [{"site": "YouTube", "type": "Trailer", "key": "yt123"}]})
+        if query.startswith("Delay"):
+            time.sleep(0.4)
+        elif query == "Slow":
+            time.sleep(3)
+        elif query == "Nothing":
+            return self._send(200, {"results": []})
+        elif query == "Broken":
+            return self._send(500, {"status_message": "Internal error"})
+        self._send(200, {"results": [{"id": 27205, "poster_path": "/poster.jpg", "vote_average": 8.37,
+                                      "overview": OVERVIEW}]})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTMDB)
+    server.daemon_threads = True
+    server.requests = Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(stub, cache=None):
+    return TMDBClient("test-key", base_url=f"http://127.0.0.1:{stub.server_port}", timeout=5, cache=cache)
+
+
+def searches(stub, title):
+    return stub.requests[("/search/movie", title)]
+
+
+def test_fetch_many_runs_lookups_concurrently(stub):
+    client = make_client(stub)
+    titles = [(f"Delay {c}", None) for c in "ABCD"]
+    start = time.monotonic()
+    results = client.fetch_many(titles, deadline=5)
+    elapsed = time.monotonic() - start
+    client.close()
+
+    assert elapsed < 1.2  # four 0.4s searches one after another would take 1.6s
+    assert [r["poster"] for r in results] == ["https://image.tmdb.org/t/p/w500/poster.jpg"] * 4
+    assert all(r["rating"] == 8.4 and r["trailer"] == "https://www.youtube.com/watch?v=yt123" for r in results)
+
+
+def test_deadline_turns_slow_lookups_into_placeholders(stub):
+    client = make_client(stub)
+    start = time.monotonic()
+    fast, slow = client.fetch_many([("Inception", None), ("Slow", "AI overview")], deadline=0.8)
+    elapsed = time.monotonic() - start
+    client.close()
+
+    assert elapsed < 2
+    assert fast["poster"].endswith("/poster.jpg")
+    assert slow["poster"] == PLACEHOLDER_POSTER
+    assert slow["overview"] == "AI overview"
+
+
+def test_cache_hit_skips_the_request(stub, tmp_path):
+    cache = TMDBCache(tmp_path / "tmdb.sqlite")
+    client = make_client(stub, cache)
+    first = client.fetch("Inception")
+    second = client.fetch("Inception")
+    client.close()
+
+    assert first == second
+    assert searches(stub, "Inception") == 1
+    assert cache.get("search", "Inception")["id"] == 27205
+
+
+def test_empty_answer_is_cached_as_negative(stub, tmp_path):
+    cache = TMDBCache(tmp_path / "tmdb.sqlite")
+    client = make_client(stub, cache)
+    client.fetch("Nothing")
+    result = client.fetch("Nothing")
+    client.close()
+
+    assert result["poster"] == PLACEHOLDER_POSTER
+    assert searches(stub, "Nothing") == 1
+    assert cache.get("search", "Nothing") is None
+
+
+def test_server_errors_are_not_cached(stub, tmp_path):
+    cache = TMDBCache(tmp_path / "tmdb.sqlite")
+    client = make_client(stub, cache)
+    client.fetch("Broken")
+    result = client.fetch("Broken")
+    client.close()
+
+    assert result["poster"] == PLACEHOLDER_POSTER
+    assert searches(stub, "Broken") == 2
+    assert cache.get("search", "Broken") is MISSING
+
+
+def test_lookups_do_not_wait_for_the_write_lock(tmp_path):
+    cache = TMDBCache(tmp_path / "tmdb.sqlite")
+    cache.put("search", "Inception", {"id": 27205})
+    writer = sqlite3.connect(tmp_path / "tmdb.sqlite", isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")  # another process holding the only WAL write lock
+
+    start = time.perf_counter()
+    for _ in range(10):
+        assert cache.get("search", "Inception") == {"id": 27205}
+        assert cache.get("search", "Unknown") is MISSING
+    assert time.perf_counter() - start < 1.0
+
+    writer.execute("ROLLBACK")
+    assert cache.stats()["hits"] == 10
+    assert cache.stats()["misses"] == 10
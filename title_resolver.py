@@ -0,0 +1,127 @@
+import re
+import unicodedata
+
+import numpy as np
+
+DEFAULT_MIN_SCORE = 0.8
+
+_YEAR = re.compile(r"\(\s*\d{4}\s*\)")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(title):
+    """'Amélie (2001)' -> 'amelie': accents, case, punctuation and a trailing year folded away."""
+    title = unicodedata.normalize("NFKD", str(title))
+    title = "".join(c for c in title if not unicodedata.combining(c)).casefold()
+    title = _YEAR.sub(" ", title)
+    return _NON_ALNUM.sub(" ", title).strip()
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def same_shape(a, b):
+    """Whether two normalized titles have as many words and the same numbers.
+
+    Keeps fuzzy matches from mapping sequels ('toy story 3') or near-misses
+    onto a different film; those fall through to TMDB instead.
+    """
+    a, b = a.split(), b.split()
+    return len(a) == len(b) and [t for t in a if t.isdigit()] == [t for t in b if t.isdigit()]
+
+
+class TitleResolver:
+    """Maps free-form titles (e.g. from Jarvis) to catalog rows.
+
+    Exact matches on the normalized title are a dict lookup; everything else
+    falls back to a character-trigram inverted index scored with the Dice
+    coefficient. Fuzzy matches must also have the same number of words and
+    the same numbers (see same_shape). Ties go to the more voted-on movie,
+    then the lower row.
+
+    normalized   -> normalized title of every row
+    grams        -> trigram strings, position = trigram id
+    gram_offsets -> (G + 1,) int64 CSR offsets into `gram_rows`
+    gram_rows    -> int32 rows containing each trigram
+    row_grams    -> (N,) int16 number of distinct trigrams per row
+    popularity   -> (N,) vote counts used for tie-breaks
+    """
+
+    def __init__(self, normalized, grams, gram_offsets, gram_rows, row_grams, popularity):
+        self.normalized = normalized
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.gram_rows = gram_rows
+        self.row_grams = row_grams
+        self.popularity = popularity
+
+        self.gram_ids = {g: i for i, g in enumerate(grams)}
+        self.exact = {}
+        for row, norm in enumerate(normalized):
+            best = self.exact.get(norm)
+            if best is None or popularity[row] > popularity[best]:
+                self.exact[norm] = row
+
+    def resolve(self, title, limit=5, min_score=DEFAULT_MIN_SCORE):
+        """Ranked [(row, score)] for `title`, best first; score 1.0 means an exact match."""
+        norm = normalize(title)
+        if not norm:
+            return []
+
+        exact_row = self.exact.get(norm)
+        if exact_row is not None and limit == 1:
+            return [(exact_row, 1.0)]
+
+        query_grams = trigrams(norm)
+        query = [self.gram_ids[g] for g in query_grams if g in self.gram_ids]
+        n_query = len(query_grams)
+        if not query:
+            return [(exact_row, 1.0)] if exact_row is not None else []
+
+        postings = [self.gram_rows[self.gram_offsets[g]:self.gram_offsets[g + 1]] for g in query]
+        rows, shared = np.unique(np.concatenate(postings), return_counts=True)
+        scores = 2.0 * shared / (n_query + self.row_grams[rows])
+        if exact_row is not None:
+            scores[rows == exact_row] = 1.0
+
+        keep = scores >= min_score
+        rows, scores = rows[keep], scores[keep]
+        shaped = np.array([row == exact_row or same_shape(norm, self.normalized[row]) for row in rows], dtype=bool)
+        rows, scores = rows[shaped], scores[shaped]
+        order = np.lexsort((rows, -self.popularity[rows], -scores))[:limit]
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def resolve_many(self, titles, min_score=DEFAULT_MIN_SCORE):
+        """Best (row, score) for each title, or None when nothing scores high enough."""
+        results = []
+        for title in titles:
+            best = self.resolve(title, limit=1, min_score=min_score)
+            results.append(best[0] if best else None)
+        return results
+
+
+def build_title_resolver(titles, popularity):
+    """Builds a TitleResolver from row titles and vote counts."""
+    normalized = [normalize(t) for t in titles]
+    # Sorted everywhere: set order depends on hash seeding, and the artifact must not
+    row_gram_lists = [sorted(trigrams(norm)) if norm else [] for norm in normalized]
+    grams = sorted({g for row_grams_list in row_gram_lists for g in row_grams_list})
+    gram_ids = {g: i for i, g in enumerate(grams)}
+    owners, ids = [], []
+    row_grams = np.zeros(len(normalized), dtype=np.int16)
+    for row, row_grams_list in enumerate(row_gram_lists):
+        row_grams[row] = min(len(row_grams_list), np.iinfo(np.int16).max)
+        for g in row_grams_list:
+            ids.append(gram_ids[g])
+            owners.append(row)
+
+    ids = np.array(ids, dtype=np.int64)
+    owners = np.array(owners, dtype=np.int32)
+    order = np.lexsort((owners, ids))
+    gram_rows = owners[order]
+    gram_offsets = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=len(gram_ids)), out=gram_offsets[1:])
+    return TitleResolver(normalized, grams, gram_offsets, gram_rows, row_grams,
+                         np.asarray(popularity, dtype=np.int64))
@@ -0,0 +1,151 @@
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.tmdb_cache import MISSING
+
+TMDB_API_URL = "https://api.themoviedb.org/3"
+PLACEHOLDER_POSTER = "https://via.placeholder.com/300x450?text=No+Poster"
+
+
+def placeholder(movie_title, ai_overview=None):
+    """Card data used until (or instead of) a TMDB answer."""
+    return {
+        "poster": PLACEHOLDER_POSTER,
+        "rating": "N/A",
+        "overview": ai_overview if ai_overview else "No details available.",
+        "trailer": f"https://www.youtube.com/results?search_query={urllib.parse.quote(movie_title)}+trailer"
+    }
+
+
+class TMDBClient:
+    """Pooled, concurrent TMDB lookups for Jarvis cards.
+
+    One keep-alive session and one thread pool are shared by every caller,
+    so create a single client per process. `base_url` can point at a local
+    stub server for testing. With a TMDBCache, search results and trailer
+    lookups (including "nothing found") are served from it when fresh.
+    """
+
+    def __init__(self, api_key, base_url=TMDB_API_URL, timeout=3, max_workers=8, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb")
+
+    def _get(self, path, params, deadline):
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError("TMDB deadline exceeded")
+        response = self.session.get(f"{self.base_url}{path}", params={"api_key": self.api_key, **params},
+                                    timeout=timeout)
+        # A 401/429/5xx is an error, not "no match": it must not become a negative cache entry
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    def _cached(self, kind, key, lookup):
+        if self.cache is None:
+            return lookup()
+        value = self.cache.get(kind, key)
+        if value is MISSING:
+            value = lookup()  # transport and HTTP errors raise here and are never stored
+            self.cache.put(kind, key, value)
+        return value
+
+    def _search(self, movie_title, deadline):
+        """Top search hit (only the fields cards use), or None."""
+        def lookup():
+            params = {"query": movie_title, "page": 1, "include_adult": "false"}
+            results = self._get("/search/movie", params, deadline)
+            if not results:
+                return None
+            top = results[0]
+            return {k: top.get(k) for k in ("id", "poster_path", "vote_average", "overview")}
+        return self._cached("search", movie_title, lookup)
+
+    def _trailer_key(self, movie_id, deadline):
+        """YouTube key of the first trailer, or None."""
+        def lookup():
+            for vid in self._get(f"/movie/{movie_id}/videos", {}, deadline):
+                if vid["site"] == "YouTube" and vid["type"] == "Trailer":
+                    return vid["key"]
+            return None
+        return self._cached("videos", str(movie_id), lookup)
+
+    def fetch(self, movie_title, ai_overview=None, deadline=None):
+        """Fetches Poster, Rating, and Trailer from TMDB.
+
+        `deadline` is a time.monotonic() timestamp both requests must finish by.
+        """
+        data = placeholder(movie_title, ai_overview)
+
+        try:
+            top_result = self._search(movie_title, deadline)
+
+            if top_result:
+                movie_id = top_result["id"]
+
+                if top_result.get("poster_path"):
+                    data["poster"] = f"https://image.tmdb.org/t/p/w500{top_result['poster_path']}"
+                if top_result.get("vote_average"):
+                    data["rating"] = round(top_result.get("vote_average"), 1)
+
+                tmdb_overview = top_result.get("overview") or ""
+                if len(tmdb_overview) > 20:
+                    data["overview"] = tmdb_overview
+
+                trailer_key = self._trailer_key(movie_id, deadline)
+                if trailer_key:
+                    data["trailer"] = f"https://www.youtube.com/watch?v={trailer_key}"
+        except Exception as e:
+            print(f"TMDB Error: {e}")
+
+        return data
+
+    def submit(self, items, deadline=5.0):
+        """Starts fetching (title, ai_overview) pairs in the background; hand the result to gather()."""
+        until = time.monotonic() + deadline
+        return [(self._executor.submit(self.fetch, title, overview, until), title, overview, until)
+                for title, overview in items]
+
+    def gather(self, lookups):
+        """Card data for submitted lookups, in order.
+
+        Lookups still running at their deadline are abandoned and come back
+        as placeholders.
+        """
+        if not lookups:
+            return []
+        wait([future for future, _, _, _ in lookups], timeout=max(0.0, max(l[3] for l in lookups) - time.monotonic()))
+
+        results = []
+        for future, title, overview, _ in lookups:
+            if future.done() and not future.cancelled():
+                results.append(future.result())
+            else:
+                future.cancel()
+                results.append(placeholder(title, overview))
+        return results
+
+    def fetch_many(self, items, deadline=5.0):
+        """Fetches every (title, ai_overview) pair concurrently.
+
+        Returns card data in input order. Lookups still running after
+        `deadline` seconds are abandoned and come back as placeholders.
+        """
+        return self.gather(self.submit(items, deadline))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,137 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from utils.sqlite_store import SQLiteStore
+
+DEFAULT_TTL = 7 * 24 * 3600           # positive answers: one week
+DEFAULT_NEGATIVE_TTL = 24 * 3600      # "not on TMDB" answers: one day
+DEFAULT_MAX_ENTRIES = 20_000
+TOUCH_INTERVAL = 3600                 # last_access is refreshed at most hourly, so LRU order is approximate
+STATS_FLUSH_EVERY = 100               # lookups counted in memory before they are added to the shared totals
+
+MISSING = object()
+
+
+def normalize_title(title):
+    """'  The  Dark Knight ' -> 'the dark knight' (case, accents and spacing folded)."""
+    title = unicodedata.normalize("NFKC", str(title)).casefold()
+    return re.sub(r"\s+", " ", title).strip()
+
+
+class TMDBCache:
+    """SQLite-backed TMDB answer cache with TTL and LRU eviction.
+
+    Safe to share between threads, Streamlit sessions and server processes
+    (see SQLiteStore). A cached value of None is a negative answer ("TMDB has nothing").
+
+    Reads stay read-only as far as possible, since WAL allows one writer at
+    a time: a hit refreshes its LRU timestamp only when it is older than
+    `touch_interval`, and hit/miss counters are kept per process (`hits`,
+    `misses`) and added to the cross-process totals in the database every
+    STATS_FLUSH_EVERY lookups and on `stats()`.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 touch_interval=TOUCH_INTERVAL):
+        self._store = SQLiteStore(path, max_entries)
+        self.path = self._store.path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._unflushed = Counter()
+        self._lock = threading.Lock()
+
+        with self._store.conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    @staticmethod
+    def _key(kind, key):
+        return f"{kind}:{normalize_title(key)}"
+
+    def get(self, kind, key, default=MISSING):
+        """Cached value for (kind, key), or `default` (a sentinel) on a miss."""
+        now = time.time()
+        conn = self._store.conn()
+        row = conn.execute(
+            "SELECT payload, last_access FROM entries WHERE key = ? AND expires_at > ?", (self._key(kind, key), now)
+        ).fetchone()
+
+        hit = row is not None
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._unflushed["hits" if hit else "misses"] += 1
+            flush = sum(self._unflushed.values()) >= STATS_FLUSH_EVERY
+        try:
+            if hit and now - row[1] >= self.touch_interval:
+                with conn:
+                    conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, self._key(kind, key)))
+            if flush:
+                self._flush_stats(conn)
+        except sqlite3.OperationalError:
+            pass  # bookkeeping only: a busy database must not turn a hit into an error
+
+        if not hit:
+            return default
+        return None if row[0] is None else json.loads(row[0])
+
+    def put(self, kind, key, value):
+        """Stores a JSON-serializable value; None records a negative answer."""
+        now = time.time()
+        ttl = self.negative_ttl if value is None else self.ttl
+        payload = None if value is None else json.dumps(value)
+        conn = self._store.conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (self._key(kind, key), payload, now + ttl, now),
+            )
+            self._store.evict(conn, now)
+
+    def _flush_stats(self, conn):
+        with self._lock:
+            counts, self._unflushed = self._unflushed, Counter()
+        try:
+            with conn:
+                conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?",
+                                 [(n, name) for name, n in counts.items()])
+        except sqlite3.OperationalError:
+            with self._lock:
+                self._unflushed.update(counts)  # retried with the next flush
+            raise
+
+    def stats(self):
+        """Cross-process totals plus the current entry count."""
+        conn = self._store.conn()
+        self._flush_stats(conn)
+        totals = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        (entries,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        return {
+            "hits": totals.get("hits", 0),
+            "misses": totals.get("misses", 0),
+            "hit_rate": totals.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._store.conn() as conn:
+            conn.execute("DELETE FROM entries")